@@ -1,8 +1,52 @@
+import csv
+from io import StringIO
+from concurrent.futures import ThreadPoolExecutor
 from sqlalchemy import create_engine
-from typing import Tuple
-from ast import literal_eval
+from typing import Callable, Iterable, List, Optional, Tuple
+import numpy as np
 import pandas as pd
 
+
+def _pg_array(values) -> str:
+    '''
+    Formats a list, tuple or numpy array as a postgres array literal, e.g. '{0,500,10079}'.
+    Numpy arrays are converted with tolist, so the values are not written with the numpy repr.
+    '''
+    if isinstance(values, np.ndarray):
+        values = values.tolist()
+    return '{' + ','.join(map(str, values)) + '}'
+
+def _psql_copy(pd_table, conn, keys: List[str], data_iter: Iterable[tuple]):
+    '''
+    Insertion method for DataFrame.to_sql that bulk loads the rows with the postgres COPY command
+    instead of issuing a parameterised INSERT per row.
+    List and array values (such as the curve columns "X" and "Y") are written as postgres array
+    literals so they are stored in the same format as with a regular insert.
+
+    Parameters:
+    - pd_table: pandas SQLTable that is being written to.
+    - conn: sqlalchemy connection used by to_sql.
+    - keys: the column names of the rows.
+    - data_iter: iterable with the rows to write.
+    '''
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    for row in data_iter:
+        writer.writerow([
+            _pg_array(value) if isinstance(value, (list, tuple, np.ndarray)) else value
+            for value in row
+        ])
+    buffer.seek(0)
+
+    columns = ', '.join(f'"{key}"' for key in keys)
+    if pd_table.schema:
+        table_name = f'{pd_table.schema}.{pd_table.name}'
+    else:
+        table_name = pd_table.name
+
+    with conn.connection.cursor() as cursor:
+        cursor.copy_expert(f'COPY {table_name} ({columns}) FROM STDIN WITH CSV', buffer)
+
 class DBConnection:
     """
     Generic class that connects to a database. On exit the connection is closed.
@@ -51,13 +95,26 @@ class PgConnection(DBConnection):
      * host
      * database
      * username
-     * password. \n"""
+     * password. \n
+    The engine uses the psycopg2 fast execution helpers for executemany statements,
+    this requires SQLAlchemy 2.0 or higher."""
+    # Number of rows fetched per round trip when reading from the database.
+    chunksize: int = 50_000
+    # Number of rows written per COPY command when writing to the database.
+    batch_size: int = 100_000
+
     def establish_connection(self):
         """Establishes a connection"""
         connection_string = (
             f"postgresql+psycopg2://{self.username}:{self.password}@{self.host}/{self.database}"
         )
-        self.engine = create_engine(connection_string, isolation_level="AUTOCOMMIT")
+        self.engine = create_engine(
+            connection_string,
+            isolation_level="AUTOCOMMIT",
+            executemany_mode="values_plus_batch",
+            insertmanyvalues_page_size=10_000,
+            executemany_batch_page_size=2_000
+        )
         self.conn = self.engine.connect()
         self.cursor = self.conn.connection.cursor()
 
@@ -68,8 +125,11 @@ class PgConnection(DBConnection):
         ) -> Tuple[pd.DataFrame, pd.DataFrame]:
         '''
         Reads the qos_data and qos_curves from the database and converts the columns "X" and
-        "Y" in lists of floats.
-        
+        "Y" in arrays of floats.
+        The results are streamed with a server-side cursor and read in chunks of
+        self.chunksize rows, the curves are converted per chunk. Both tables are read
+        concurrently, each on its own connection from the connection pool of the engine.
+
         Parameters:
         - qos_data_table: the postgres table where the qos_data is stored
         - qos_curves_table: the postgres table where the qos_curves data is stored
@@ -81,33 +141,86 @@ class PgConnection(DBConnection):
         query_qos_data: str = f'SELECT * FROM {qos_data_table}'
         query_qos_curves: str = f'SELECT * FROM {qos_curves_table}'
 
-        qos_data: pd.DataFrame = pd.read_sql(query_qos_data, con=self.engine)
-        qos_curves: pd.DataFrame = pd.read_sql(query_qos_curves, con=self.engine)
-
-        # Convert strings to lists of integers
-        qos_curves['X'] = qos_curves['X'].apply(
-            lambda x: list(map(float, literal_eval(x.replace('{', '[').replace('}', ']'))))
-        )
-        qos_curves['Y'] = qos_curves['Y'].apply(
-            lambda y: list(map(float, literal_eval(y.replace('{', '[').replace('}', ']'))))
-        )
+        # The reads are waiting on the database, so threads can run them concurrently.
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            future_qos_data = executor.submit(self._read_query, query_qos_data)
+            future_qos_curves = executor.submit(
+                self._read_query, query_qos_curves, self._convert_curves
+            )
+            qos_data: pd.DataFrame = future_qos_data.result()
+            qos_curves: pd.DataFrame = future_qos_curves.result()
 
         return qos_data, qos_curves
 
-    def db_write_data(self, data: pd.DataFrame, target_table: str, target_schema: str):
+    def _read_query(
+            self,
+            query: str,
+            convert: Optional[Callable[[pd.DataFrame], pd.DataFrame]] = None
+        ) -> pd.DataFrame:
+        '''
+        Reads the result of a query in chunks of self.chunksize rows, streamed with a
+        server-side cursor on a new connection. The optional convert function is applied to
+        each chunk.
+        The engine runs in autocommit mode, but psycopg2 only allows server-side cursors inside
+        a transaction, so the read connection uses the isolation level READ COMMITTED. The
+        isolation level is reset when the connection is returned to the pool.
+        '''
+        with self.engine.connect().execution_options(
+            isolation_level="READ COMMITTED",
+            stream_results=True,
+            max_row_buffer=self.chunksize
+        ) as connection:
+            return pd.concat(
+                [
+                    convert(chunk) if convert else chunk
+                    for chunk in pd.read_sql(query, con=connection, chunksize=self.chunksize)
+                ],
+                ignore_index=True
+            )
+
+    @staticmethod
+    def _convert_curves(qos_curves: pd.DataFrame) -> pd.DataFrame:
+        '''
+        Converts the postgres array strings (e.g. '{0,500,10079}') in the columns "X" and "Y"
+        to numpy float32 arrays. The braces are stripped and the values are parsed by numpy.
         '''
-        Writes a dataframe to a target table.
-        
+        for column in ['X', 'Y']:
+            qos_curves[column] = [
+                np.fromstring(text[1:-1], sep=',', dtype=np.float32)
+                for text in qos_curves[column].to_numpy()
+            ]
+
+        return qos_curves
+
+    def db_write_data(
+            self,
+            data: pd.DataFrame,
+            target_table: str,
+            target_schema: str,
+            batch_size: Optional[int] = None
+        ):
+        '''
+        Writes a dataframe to a target table. The rows are loaded with the postgres COPY command
+        in batches of batch_size rows. All batches are written in a single transaction, so the
+        commit is done once and a failed write leaves the target table unchanged.
+
         Parameters:
         - data: the data to write to the table.
         - target_table: the postgres table where the output should be written to.
         - target_schema: the schema to write the data to.
+        - batch_size: the number of rows per COPY command, defaults to self.batch_size.
         '''
-        data.reset_index(inplace=True)
-        data.to_sql(
-            target_table,
-            con=self.engine,
-            schema=target_schema,
-            if_exists='append',
-            index=False
-        )
+        data = data.reset_index(drop=False)
+        # The engine runs in autocommit mode, the write connection opens its own transaction.
+        with self.engine.connect().execution_options(
+            isolation_level="READ COMMITTED"
+        ) as connection, connection.begin():
+            data.to_sql(
+                target_table,
+                con=connection,
+                schema=target_schema,
+                if_exists='append',
+                index=False,
+                chunksize=batch_size or self.batch_size,
+                method=_psql_copy
+            )
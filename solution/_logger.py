@@ -1,23 +1,64 @@
+import atexit
 import logging
+import logging.handlers
+import queue
 from pathlib import Path
 
+# The running queue listener per logger name, so a new setup can stop the previous one.
+_LISTENERS = {}
+
+def _stop_listener(name):
+    '''Stops the queue listener of the named logger and closes its handlers.'''
+    listener = _LISTENERS.pop(name, None)
+    if listener is not None:
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+
+@atexit.register
+def _stop_listeners():
+    '''Flushes the remaining records on the queues when the script exits.'''
+    for name in list(_LISTENERS):
+        _stop_listener(name)
+
 class CustomLogger():
-    def __init__(self, log_file='app.log', log_dir='logs'):
+    '''
+    Sets up the named logger of the qos algorithm, which writes to a log file and the console.
+    Log records are put on a queue and written to the handlers by a background thread, so
+    logging calls don't wait on the file I/O.
+    '''
+    def __init__(self, log_file='app.log', log_dir='logs', name='qos'):
         if Path(log_dir).is_absolute():
-            self.log_dir = log_dir
+            self.log_dir = Path(log_dir)
         else:
             self.log_dir = Path.cwd() / log_dir
         self.log_file = self.log_dir / log_file
+        self.logger = logging.getLogger(name)
+        self.listener = None
         self._setup_logging()
 
     def _setup_logging(self):
         self.log_dir.mkdir(parents=True, exist_ok=True)
 
-        logging.basicConfig(
-            level=logging.DEBUG,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler(self.log_file),
-                logging.StreamHandler()
-            ]
-        )
+        formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+        handlers = [
+            logging.FileHandler(self.log_file),
+            logging.StreamHandler()
+        ]
+        for handler in handlers:
+            handler.setFormatter(formatter)
+
+        # Replace the handlers of a previous setup, so the logger is always reconfigured.
+        _stop_listener(self.logger.name)
+        for handler in self.logger.handlers[:]:
+            self.logger.removeHandler(handler)
+            handler.close()
+
+        log_queue = queue.Queue(-1)
+        self.logger.addHandler(logging.handlers.QueueHandler(log_queue))
+        self.logger.setLevel(logging.DEBUG)
+        self.logger.propagate = False
+
+        self.listener = logging.handlers.QueueListener(log_queue, *handlers)
+        self.listener.start()
+        _LISTENERS[self.logger.name] = self.listener
@@ -1,5 +1,15 @@
+import numpy as np
 import pandas as pd
 
+from _qos_transformations import (
+    flatten_curves,
+    curve_bounds,
+    composite_key,
+    same_categories,
+    shared_composite_key,
+    step_curves
+)
+
 def create_product_inventory(
         inventory_curves: pd.DataFrame
 ) -> pd.DataFrame:
@@ -49,48 +59,73 @@ def create_product_inventory(
     if not set(required_columns) == set(inventory_curves.columns.tolist()):
         raise ValueError("Input DataFrame does not contain the required columns")
 
+    # Curves with a missing LOCATION or WEEK_START don't belong to a group, like in a groupby.
+    inventory_curves = inventory_curves[
+        composite_key(inventory_curves, ['LOCATION', 'WEEK_START']) != -1
+    ]
+
+    # Order the curves on INVENTORY_CURVE_ID, so the grid is created in the output order.
+    inventory_curves = inventory_curves.sort_values(by='INVENTORY_CURVE_ID', kind='stable')
+    curves: pd.DataFrame = inventory_curves.drop(columns=['X', 'Y']).reset_index(drop=True)
+
+    # Pivot the lists X and Y
+    inventory_points, lengths = flatten_curves(inventory_curves)
+    points_x: np.ndarray = inventory_points['X'].to_numpy(dtype=np.int64)
+
     # Check if the minimum and maximum of each X is equal to 0 and 10079
-    if inventory_curves[inventory_curves['X'].apply(min) != 0].shape[0] != 0:
+    x_min, x_max = curve_bounds(points_x, lengths)
+    if (x_min != 0).any():
         raise ValueError("Input data contains X column with missing timepoint 0")
 
-    if inventory_curves[inventory_curves['X'].apply(max) != 10079].shape[0] != 0:
+    if (x_max != 10079).any():
         raise ValueError("Input data contains X column with missing timepoint 10079")
 
-    # Pivot the lists X and Y
-    inventory_curves = inventory_curves.explode(list('XY'))
-
     # Not each curve has all the stock (Y) at all the possible timepoints.
-    # Retrieve a grid with all the timepoints for each week and join this on the full data.
-    curve_ids: pd.DataFrame = (
-        inventory_curves[['LOCATION', 'INVENTORY_CURVE_ID', 'PRODUCT', 'WEEK_START']]
-        .drop_duplicates()
+    # Retrieve the distinct timepoints of each LOCATION and WEEK_START, sorted by X.
+    _, curve_groups = np.unique(
+        composite_key(curves, ['LOCATION', 'WEEK_START']), return_inverse=True
     )
-
-    time_points: pd.DataFrame = inventory_curves[['LOCATION', 'WEEK_START', 'X']].drop_duplicates()
-    time_point_grid: pd.DataFrame = time_points.merge(
-        curve_ids,
-        how = 'left',
-        left_on=['LOCATION', 'WEEK_START'],
-        right_on=['LOCATION', 'WEEK_START']
+    group_time_points: np.ndarray = np.unique(np.repeat(curve_groups, lengths) * 10080 + points_x)
+    group_counts: np.ndarray = np.bincount(
+        group_time_points // 10080, minlength=curve_groups.max(initial=-1) + 1
     )
-
-    product_inventory_grid: pd.DataFrame = time_point_grid.merge(
-        inventory_curves,
-        how = 'left',
-        left_on=['LOCATION', 'INVENTORY_CURVE_ID', 'WEEK_START', 'PRODUCT', 'X'],
-        right_on=['LOCATION', 'INVENTORY_CURVE_ID', 'WEEK_START', 'PRODUCT', 'X']
+    group_starts: np.ndarray = np.cumsum(group_counts) - group_counts
+
+    # Repeat the timepoints of its LOCATION and WEEK_START for each curve.
+    block_lengths: np.ndarray = group_counts[curve_groups]
+    grid_curves: np.ndarray = np.repeat(np.arange(curves.shape[0]), block_lengths)
+    block_positions: np.ndarray = (
+        np.arange(grid_curves.shape[0])
+        - np.repeat(np.cumsum(block_lengths) - block_lengths, block_lengths)
     )
-
-    # Fill the empty Y with the stock at the last timepoint with available data.
-    product_inventory_grid = product_inventory_grid.sort_values(by=['INVENTORY_CURVE_ID', 'X'])
-    product_inventory_grid['Y'] = product_inventory_grid.groupby('INVENTORY_CURVE_ID')['Y'].ffill()
-    product_inventory_grid['CONSUMPTION_PROFILE_CURVE_ID'] = (
-        product_inventory_grid
-        .groupby(['LOCATION', 'WEEK_START'])
-        ['CONSUMPTION_PROFILE_CURVE_ID']
-        .ffill()
+    grid_x: np.ndarray = group_time_points[
+        np.repeat(group_starts[curve_groups], block_lengths) + block_positions
+    ] % 10080
+
+    product_inventory_grid: pd.DataFrame = curves.iloc[grid_curves].reset_index(drop=True)
+    product_inventory_grid['X'] = grid_x.astype(np.int32)
+
+    # Fill Y with the stock at the last timepoint with available data of the same curve.
+    product_inventory_grid['Y'] = step_curves(
+        lengths,
+        points_x,
+        inventory_points['Y'].to_numpy(),
+        grid_curves,
+        grid_x
     )
 
+    product_inventory_grid = product_inventory_grid[
+        [
+            'LOCATION',
+            'WEEK_START',
+            'X',
+            'INVENTORY_CURVE_ID',
+            'PRODUCT',
+            'CONSUMPTION_PROFILE_CURVE_ID',
+            'Y'
+        ]
+    ]
+
     return product_inventory_grid
 
 def calc_product_availability_ratio(
@@ -105,8 +140,8 @@ def calc_product_availability_ratio(
     PRODUCT_IN_STOCK is added to determine if a product is in stock for each time instant
     products_in_stock contains the distinct amount of products in stock for each time instant
     Dividing products_in_stock with distinct_products determines the product_availability_ratio.
-    The result is merged with the time_point_grid and forward filled to get the product availability
-    at every minute.
+    Each minute of the time_point_grid gets the product availability ratio of the last timepoint
+    at or before it (a forward fill), to get the product availability at every minute.
 
     Parameters: 
     - product_inventory_grid: DataFrame containing a grid with the inventory (Y) at each of the
@@ -156,58 +191,94 @@ def calc_product_availability_ratio(
     if not set(required_columns_tpg) == set(time_point_grid.columns.tolist()):
         raise ValueError("Input product_inventory_grid does not contain the required columns")
 
-    # Get DataFrame with the amount of distinct products at each LOCATION and WEEK_START.
-    distinct_products: pd.DataFrame = (
+    # Combine LOCATION, WEEK_START and X into single integer keys, reused by the groupbys. The
+    # LOCATION and WEEK_START keys of both inputs are comparable, so they can be looked up in
+    # each other.
+    location_week, grid_location_week = shared_composite_key(
+        product_inventory_grid, time_point_grid, ['LOCATION', 'WEEK_START']
+    )
+    # Rows with a missing LOCATION or WEEK_START have the key -1, they don't belong to a group,
+    # like in a groupby.
+    has_key: np.ndarray = location_week != -1
+    if not has_key.all():
+        product_inventory_grid = product_inventory_grid[has_key]
+        location_week = location_week[has_key]
+    grid_has_key: np.ndarray = grid_location_week != -1
+    location_week_x: np.ndarray = (
+        location_week * 10080 + product_inventory_grid['X'].to_numpy(dtype=np.int64)
+    )
+
+    # Get the amount of distinct products at each LOCATION and WEEK_START.
+    distinct_products: pd.Series = (
         product_inventory_grid
-        .groupby(['WEEK_START', 'LOCATION'])['PRODUCT']
+        .groupby(location_week)['PRODUCT']
         .nunique()
-        .reset_index()
     )
-    distinct_products.rename(columns={'PRODUCT': 'TOTAL_PRODUCT_COUNT'}, inplace=True)
 
     # Calculate for each LOCATION WEEK_START AND time_point (X) the amount of products in stock.
-    product_inventory_grid['PRODUCT_IN_STOCK'] = (product_inventory_grid['Y'] >= 1).astype(int)
-    products_in_stock: pd.DataFrame = (
-        product_inventory_grid
-        .groupby(['LOCATION', 'WEEK_START', 'X'])
-        ['PRODUCT_IN_STOCK']
-        .sum()
-        .reset_index()
+    # The rows are sorted once on the timepoint key, so the products in stock are counted with a
+    # linear scan over the boolean in stock values of each timepoint instead of a hash groupby.
+    order: np.ndarray = np.argsort(location_week_x, kind='stable')
+    sorted_keys: np.ndarray = location_week_x[order]
+    time_point_starts: np.ndarray = np.flatnonzero(np.diff(sorted_keys, prepend=-1))
+    product_in_stock: np.ndarray = product_inventory_grid['Y'].to_numpy()[order] >= 1
+    products_in_stock: np.ndarray = np.add.reduceat(
+        product_in_stock, time_point_starts, dtype=np.int64
     )
+    time_point_keys: np.ndarray = sorted_keys[time_point_starts]
 
     # Calcualate product availability ratio
-    par_data: pd.DataFrame = products_in_stock.merge(
-        distinct_products,
-        how='left',
-        left_on=['LOCATION', 'WEEK_START'],
-        right_on=['LOCATION', 'WEEK_START'],
-        validate='many_to_one'
+    total_product_count: np.ndarray = (
+        distinct_products.reindex(time_point_keys // 10080).to_numpy()
     )
-    par_data['PA_RATIO'] = par_data['PRODUCT_IN_STOCK'] / par_data['TOTAL_PRODUCT_COUNT']
-
-    # Create product availability ratio for all interpolated time points by forward fill.
-    par_data = time_point_grid.merge(
-        par_data,
-        how='left',
-        left_on=['LOCATION', 'WEEK_START', 'X'],
-        right_on=['LOCATION', 'WEEK_START', 'X'],
-        validate='one_to_one'
+    pa_ratio: np.ndarray = (products_in_stock / total_product_count).astype(np.float32)
+
+    # Each timepoint in the time_point_grid gets the product availability ratio of the last
+    # timepoint with available data at or before it, at the same LOCATION and WEEK_START.
+    # The timepoint keys are sorted, so this is a single binary search for all the rows instead
+    # of a merge with the time_point_grid followed by a forward fill.
+    grid_keys: np.ndarray = (
+        grid_location_week * 10080 + time_point_grid['X'].to_numpy(dtype=np.int64)
     )
-    columns_to_drop: list = ['PRODUCT_IN_STOCK', 'TOTAL_PRODUCT_COUNT']
-    par_data.drop(columns=columns_to_drop, inplace=True)
-
-    # Fill the empty Y with the stock at the last timepoint with available data.
-    product_availability_ratio: pd.DataFrame = par_data.sort_values(
-        by=['LOCATION', 'WEEK_START', 'X']
+    if not pd.Index(grid_keys[grid_has_key]).is_unique:
+        raise pd.errors.MergeError(
+            "Input time_point_grid contains multiple rows for a 'LOCATION', 'WEEK_START', 'X'"
+        )
+    last_time_point: np.ndarray = np.searchsorted(time_point_keys, grid_keys, side='right') - 1
+    found: np.ndarray = (last_time_point >= 0) & grid_has_key
+    found[found] = (
+        time_point_keys[last_time_point[found]] // 10080 == grid_location_week[found]
     )
-    product_availability_ratio['PA_RATIO'] = (
-        product_availability_ratio
-        .groupby(['LOCATION', 'WEEK_START'])['PA_RATIO']
-        .ffill()
+    grid_pa_ratio: np.ndarray = np.full(grid_keys.shape[0], np.nan, dtype=np.float32)
+    grid_pa_ratio[found] = pa_ratio[last_time_point[found]]
+
+    # The grid keys are unique and ordered like LOCATION, WEEK_START and X, so sorting on them
+    # is equal to sorting on these columns. Rows with a missing key are sorted last.
+    grid_keys[~grid_has_key] = grid_keys.max(initial=-1) + 1
+    product_availability_ratio: pd.DataFrame = (
+        time_point_grid
+        .reset_index(drop=True)
+        .assign(PA_RATIO=grid_pa_ratio)
+        .iloc[np.argsort(grid_keys, kind='stable')]
     )
 
     return product_availability_ratio
 
+def _aligned(left: pd.DataFrame, right: pd.DataFrame, columns: list) -> bool:
+    '''
+    Returns whether left and right contain the same values in columns, row by row. Categorical
+    columns with the same categories are compared on their codes.
+    '''
+    if left.shape[0] != right.shape[0]:
+        return False
+    for column in columns:
+        left_values, right_values = left[column], right[column]
+        if same_categories(left_values, right_values):
+            left_values, right_values = left_values.cat.codes, right_values.cat.codes
+        if not np.array_equal(left_values.to_numpy(), right_values.to_numpy()):
+            return False
+    return True
+
 def calc_quality_of_service(
         consumption_curves_interp: pd.DataFrame,
         product_availability_ratio: pd.DataFrame
@@ -252,15 +323,58 @@ def calc_quality_of_service(
     if not set(required_columns_par) == set(product_availability_ratio.columns.tolist()):
         raise ValueError("Input product_availability_ratio does not contain the required columns")
 
-    par_consum_data: pd.DataFrame = consumption_curves_interp.merge(
-        product_availability_ratio,
-        how='left',
-        left_on=['LOCATION', 'CONSUMPTION_PROFILE_CURVE_ID', 'WEEK_START', 'X'],
-        right_on=['LOCATION', 'CONSUMPTION_PROFILE_CURVE_ID', 'WEEK_START', 'X'],
-        validate='one_to_one'
+    # Rows with a missing LOCATION or WEEK_START don't belong to a group, like in a groupby.
+    consumption_curves_interp = consumption_curves_interp[
+        composite_key(consumption_curves_interp, ['LOCATION', 'WEEK_START']) != -1
+    ]
+    product_availability_ratio = product_availability_ratio[
+        composite_key(product_availability_ratio, ['LOCATION', 'WEEK_START']) != -1
+    ]
+
+    # Both DataFrames are defined on the same time point grid. Instead of merging them, the
+    # aligned columns are multiplied directly. The outputs of interpolate_consumption_curves and
+    # calc_product_availability_ratio are already in the same order, otherwise both are sorted
+    # on the grid columns first.
+    grid_columns: list = ['LOCATION', 'CONSUMPTION_PROFILE_CURVE_ID', 'WEEK_START', 'X']
+    # The keys are comparable between both DataFrames, so both are sorted in the same order also
+    # when their categories are ordered differently.
+    if not _aligned(consumption_curves_interp, product_availability_ratio, grid_columns):
+        consumption_key, ratio_key = shared_composite_key(
+            consumption_curves_interp, product_availability_ratio, grid_columns
+        )
+        consumption_curves_interp = consumption_curves_interp.iloc[
+            np.argsort(consumption_key, kind='stable')
+        ]
+        product_availability_ratio = product_availability_ratio.iloc[
+            np.argsort(ratio_key, kind='stable')
+        ]
+    if not _aligned(consumption_curves_interp, product_availability_ratio, grid_columns):
+        raise pd.errors.MergeError(
+            "Input consumption_curves_interp and product_availability_ratio do not match "
+            "one-to-one on 'LOCATION', 'CONSUMPTION_PROFILE_CURVE_ID', 'WEEK_START', 'X'"
+        )
+
+    qos_time_points: np.ndarray = (
+        product_availability_ratio['PA_RATIO'].to_numpy(dtype=float)
+        * consumption_curves_interp['CONSUMPTION_Y'].to_numpy(dtype=float)
+    )
+    # Missing values are skipped in the sum, similar to a pandas sum.
+    qos_time_points = np.nan_to_num(qos_time_points, nan=0.0)
+
+    # Sum the quality of service per LOCATION and WEEK_START.
+    location_week: np.ndarray = composite_key(
+        consumption_curves_interp, ['LOCATION', 'WEEK_START']
+    )
+    _, first_rows, groups = np.unique(location_week, return_index=True, return_inverse=True)
+    qos: pd.DataFrame = pd.DataFrame(
+        {
+            'QOS': np.bincount(
+                groups, weights=qos_time_points, minlength=first_rows.shape[0]
+            ).astype(np.float32)
+        },
+        index=pd.MultiIndex.from_frame(
+            consumption_curves_interp[['LOCATION', 'WEEK_START']].iloc[first_rows]
+        )
     )
-    par_consum_data['QOS'] = par_consum_data['PA_RATIO'] * par_consum_data['CONSUMPTION_Y']
-    qos: pd.Series = par_consum_data.groupby(['LOCATION', 'WEEK_START'])['QOS'].sum()
-    qos: pd.DataFrame = pd.DataFrame(qos)
 
     return qos
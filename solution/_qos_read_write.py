@@ -1,14 +1,20 @@
 import json
-from typing import Tuple
+import hashlib
+import inspect
+from functools import lru_cache
+from typing import Callable, List, Optional, Tuple
 from pathlib import Path
 from datetime import datetime
-from ast import literal_eval
 from _db_connection import PgConnection
+import numpy as np
 import pandas as pd
 
+@lru_cache(maxsize=1)
 def read_config(base_path: Path, config_path: Path) -> dict:
     '''
     Reads config file and converts the paths to an absolute path.
+    The config is read once per process and the same dictionary is returned on the next calls,
+    so it should not be modified.
     the location of the config file is 
     Parameters:
     - base_path: Base path of the qos algorithm folder.
@@ -19,6 +25,7 @@ def read_config(base_path: Path, config_path: Path) -> dict:
     Raises:
     - FileNotFoundError: If the input folder does not exist.
     - FileNotFoundError: If the config file does not exist.
+    - ValueError: If use_cache is true and the config does not contain the cache path.
     '''
     if not config_path.is_file():
         raise FileNotFoundError(f"The config file '{config_path}' does not exist.")
@@ -36,17 +43,28 @@ def read_config(base_path: Path, config_path: Path) -> dict:
     else:
         config['paths']['output'] = base_path / config['paths']['output']
 
+    if config.get('use_cache', False) and 'cache' not in config['paths']:
+        raise ValueError(
+            f"The config file '{config_path}' sets use_cache, but does not contain paths.cache."
+        )
+    if 'cache' in config['paths']:
+        if Path(config['paths']['cache']).is_absolute():
+            config['paths']['cache'] = Path(config['paths']['cache'])
+        else:
+            config['paths']['cache'] = base_path / config['paths']['cache']
+
     if not config['paths']['input'].is_dir():
         raise FileNotFoundError(f"The folder '{config['paths']['input']}' does not exist.")
 
     return config
 
-def convert_to_list(text):
+def convert_to_arrays(column: pd.Series) -> list:
     '''
-    This converter function converts a value to type list.
-    Used by pandas read_csv function to convert columns directly at the import.
+    This converter function converts the list strings (e.g. "[0, 500, 10079]") of a column to
+    numpy float32 arrays. The brackets are stripped and the values are parsed by numpy, this is much
+    faster than evaluating each string as a python literal.
     '''
-    return literal_eval(text)
+    return [np.fromstring(text[1:-1], sep=',', dtype=np.float32) for text in column.to_numpy()]
 
 
 def read_qos_data(input_folder: Path) -> Tuple[pd.DataFrame, pd.DataFrame]:
@@ -69,17 +87,17 @@ def read_qos_data(input_folder: Path) -> Tuple[pd.DataFrame, pd.DataFrame]:
     if not input_folder.is_dir():
         raise FileNotFoundError(f"The folder '{str(input_folder)}' does not exist.")
 
-    list_converters = {'X': convert_to_list, 'Y': convert_to_list}
-
-    # Read CSVs
+    # Read CSVs using the multithreaded pyarrow parser.
     qos_curves: pd.DataFrame = pd.read_csv(
         input_folder / 'qos_curves.csv',
-        converters=list_converters
-    )
-    qos_data: pd.DataFrame = pd.read_csv(
-        input_folder / 'qos_data.csv',
-        converters=list_converters
+        engine='pyarrow',
+        dtype={'X': str, 'Y': str}
     )
+    qos_data: pd.DataFrame = pd.read_csv(input_folder / 'qos_data.csv', engine='pyarrow')
+
+    # Convert the list strings of the curves to arrays.
+    qos_curves['X'] = convert_to_arrays(qos_curves['X'])
+    qos_curves['Y'] = convert_to_arrays(qos_curves['Y'])
 
     return qos_data, qos_curves
 
@@ -104,3 +122,95 @@ def write_data(data: pd.DataFrame, filename: str, output_path: Path):
 
     filename = f'{filename}_{datetime_str}.csv'
     data.to_csv(output_path / filename, index=True)
+
+def cache_key(
+        fn: Callable,
+        source_files: List[Path],
+        depends_on: Optional[str] = None,
+        **kwargs
+) -> str:
+    '''
+    Returns the cache key of the output of fn(**kwargs). The key consists of the name of fn, the
+    modification time and size of the source_files and of the file that defines fn, the
+    arguments and the key of the cached step that produced the DataFrame arguments.
+
+    Parameters:
+    - fn: function which returns a tuple of DataFrames.
+    - source_files: the files the output of fn depends on, such as the input csv's.
+    - depends_on: the cache key of the step that computed the DataFrame arguments of fn.
+    - kwargs: the arguments to call fn with.
+
+    Returns:
+    - key: the cache key.
+
+    Raises:
+    - ValueError: If a DataFrame argument is given without depends_on, its contents are not part
+    of the key.
+    '''
+    key_parts: list = [fn.__name__, str(depends_on)]
+    for file in [*source_files, Path(inspect.getfile(fn))]:
+        file_stat = Path(file).stat()
+        key_parts.append(f'{file}:{file_stat.st_mtime_ns}:{file_stat.st_size}')
+    for name, value in sorted(kwargs.items()):
+        if isinstance(value, pd.DataFrame):
+            if depends_on is None:
+                raise ValueError(
+                    f"The DataFrame argument '{name}' of {fn.__name__} requires depends_on, the "
+                    "cache key of the step that computed it."
+                )
+            continue
+        key_parts.append(f'{name}={value!r}')
+
+    return hashlib.sha256('|'.join(key_parts).encode('utf-8')).hexdigest()[:16]
+
+def cache_or_compute(
+        fn: Callable,
+        cache_folder: Path,
+        source_files: List[Path],
+        depends_on: Optional[str] = None,
+        **kwargs
+) -> Tuple[Tuple[pd.DataFrame, ...], str]:
+    '''
+    Returns the DataFrames computed by fn(**kwargs) from a parquet cache in the cache_folder.
+    If they are not cached yet, they are computed and written to the cache. The dtypes of the
+    DataFrames are stored next to the parquet files, so a cached output has the same dtypes as a
+    computed one.
+    The output is recomputed when the key of cache_key changes, so when the input data, the
+    code, the arguments or the cached step that computed the DataFrame arguments change.
+
+    Parameters:
+    - fn: function which returns a tuple of DataFrames.
+    - cache_folder: the folder to store the cached parquet files in.
+    - source_files: the files the output of fn depends on, such as the input csv's.
+    - depends_on: the cache key of the step that computed the DataFrame arguments of fn.
+    - kwargs: the arguments to call fn with.
+
+    Returns:
+    - The tuple of DataFrames returned by fn.
+    - key: the cache key of the output, to pass as depends_on to the steps that use it.
+    '''
+    key: str = cache_key(fn, source_files, depends_on, **kwargs)
+
+    cache_path: Path = cache_folder / f'{fn.__name__}_{key}'
+    if cache_path.is_dir():
+        cache_files = sorted(cache_path.glob('*.parquet'), key=lambda file: int(file.stem))
+        # Parquet doesn't keep all the dtypes, such as categoricals with integer categories, so
+        # the dtypes of the computed DataFrames are restored.
+        dtypes: list = pd.read_pickle(cache_path / 'dtypes.pkl')
+        cached: Tuple[pd.DataFrame, ...] = tuple(
+            pd.read_parquet(file, engine='pyarrow').astype(file_dtypes.to_dict())
+            for file, file_dtypes in zip(cache_files, dtypes)
+        )
+        return cached, key
+
+    result: Tuple[pd.DataFrame, ...] = fn(**kwargs)
+
+    # Write to a temporary folder first, so an interrupted write is never read as cache.
+    temp_path: Path = cache_folder / f'{cache_path.name}.tmp'
+    temp_path.mkdir(parents=True, exist_ok=True)
+    for i, data in enumerate(result):
+        data.to_parquet(temp_path / f'{i}.parquet', engine='pyarrow', compression='zstd')
+    pd.to_pickle([data.dtypes for data in result], temp_path / 'dtypes.pkl')
+    temp_path.rename(cache_path)
+
+    return result, key
@@ -1,5 +1,6 @@
 
 from typing import Tuple
+import numpy as np
 import pandas as pd
 
 def transform_qos_data(
@@ -42,8 +43,8 @@ def transform_qos_data(
     '''
 
     # Drop date from qos_data, we will use the week information from the curves data instead.
-    qos_data.drop(columns='DATE', inplace=True)
-    qos_data.drop_duplicates(inplace=True)
+    # A new DataFrame is created, so the qos_data of the caller is not modified.
+    qos_data = qos_data.drop(columns='DATE').drop_duplicates()
 
     # Retrieve the inventory curve
     mask_inventory: pd.Series = qos_curves['CURVE_TYPE'] == 'inventory'
@@ -76,11 +77,246 @@ def transform_qos_data(
         'CURVE_ID'
         ]
 
-    inventory_curves.drop(columns=columns_to_drop, inplace=True)
-    consumption_curves.drop(columns=columns_to_drop, inplace=True)
+    inventory_curves = inventory_curves.drop(columns=columns_to_drop)
+    consumption_curves = consumption_curves.drop(columns=columns_to_drop)
+
+    # Convert the key columns to categoricals, so the merges and groupbys in the next steps
+    # use the integer category codes. Columns in both DataFrames share the same categories.
+    # Missing values are no category, they get the code -1.
+    for column in ['LOCATION', 'CONSUMPTION_PROFILE_CURVE_ID', 'WEEK_START']:
+        categories: pd.Series = (
+            pd.concat([inventory_curves[column], consumption_curves[column]])
+            .dropna()
+            .drop_duplicates()
+            .sort_values()
+        )
+        column_dtype = pd.CategoricalDtype(categories)
+        inventory_curves[column] = inventory_curves[column].astype(column_dtype)
+        consumption_curves[column] = consumption_curves[column].astype(column_dtype)
+
+    for column in ['PRODUCT', 'INVENTORY_CURVE_ID']:
+        inventory_curves[column] = inventory_curves[column].astype('category')
 
     return inventory_curves, consumption_curves
 
+def flatten_curves(curves: pd.DataFrame) -> Tuple[pd.DataFrame, np.ndarray]:
+    '''
+    Flattens the curves so that each row contains a single timepoint (X) and value (Y).
+    The X and Y values of all the curves are concatenated into a single array and the other
+    columns are repeated for each of the timepoints of a curve. This replaces DataFrame.explode,
+    which unpacks the curves row by row.
+
+    Parameters:
+    - curves: DataFrame containing a curve in the columns "X" and "Y" of each row.
+
+    Returns:
+    - flat_curves: DataFrame with the same columns as curves, containing a single X and Y
+    value per row. The timepoints X are stored as int32 and the values Y as float32.
+    - lengths: array with the amount of timepoints of each curve.
+
+    Raises:
+    - ValueError: If a row contains a different amount of values in X and Y.
+    '''
+    lengths: np.ndarray = np.fromiter(
+        (len(x) for x in curves['X']), dtype=np.int64, count=curves.shape[0]
+    )
+    lengths_y: np.ndarray = np.fromiter(
+        (len(y) for y in curves['Y']), dtype=np.int64, count=curves.shape[0]
+    )
+    if not np.array_equal(lengths, lengths_y):
+        raise ValueError("Input curves contains rows with a different amount of values in X and Y")
+
+    flat_curves: pd.DataFrame = (
+        curves
+        .drop(columns=['X', 'Y'])
+        .iloc[np.repeat(np.arange(curves.shape[0]), lengths)]
+        .reset_index(drop=True)
+    )
+    if curves.shape[0] > 0:
+        flat_curves['X'] = np.concatenate(curves['X'].tolist()).astype(np.int32)
+        flat_curves['Y'] = np.concatenate(curves['Y'].tolist()).astype(np.float32)
+    else:
+        flat_curves['X'] = np.empty(0, dtype=np.int32)
+        flat_curves['Y'] = np.empty(0, dtype=np.float32)
+
+    return flat_curves[curves.columns.tolist()], lengths
+
+def curve_bounds(x: np.ndarray, lengths: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    '''
+    Determines the minimum and maximum timepoint (X) of each curve in a single vectorized pass
+    over the flattened X values.
+
+    Parameters:
+    - x: the concatenated X values of the curves. Retrieved from function flatten_curves.
+    - lengths: the amount of timepoints of each curve. Retrieved from function flatten_curves.
+
+    Returns:
+    - x_min: array with the minimum X of each curve.
+    - x_max: array with the maximum X of each curve.
+
+    Raises:
+    - ValueError: If a curve does not contain any timepoints.
+    '''
+    if (lengths == 0).any():
+        raise ValueError("Input curves contains rows without any timepoints")
+    if lengths.shape[0] == 0:
+        return np.empty(0, dtype=x.dtype), np.empty(0, dtype=x.dtype)
+
+    starts: np.ndarray = np.cumsum(lengths) - lengths
+    return np.minimum.reduceat(x, starts), np.maximum.reduceat(x, starts)
+
+def _curve_points(lengths: np.ndarray, x: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    '''
+    Offsets the timepoints (X) of each curve by 10080 times the number of the curve, so the
+    timepoints of all the curves can be searched at once.
+    Returns the sorted offset timepoints and the order to sort the values of the curves with.
+    '''
+    points: np.ndarray = np.repeat(np.arange(lengths.shape[0]), lengths) * 10080 + x
+    order: np.ndarray = np.argsort(points, kind='stable')
+
+    return points[order], order
+
+def step_curves(
+        lengths: np.ndarray,
+        x: np.ndarray,
+        y: np.ndarray,
+        grid_curves: np.ndarray,
+        grid_x: np.ndarray
+) -> np.ndarray:
+    '''
+    Evaluates the curves as step functions at the grid timepoints. The value at a grid
+    timepoint is the value (Y) at the last known timepoint (X) of the same curve.
+    All the curves are evaluated with a single searchsorted. Each curve should contain X = 0,
+    so the last known timepoint is always part of the same curve.
+
+    Parameters:
+    - lengths: the amount of timepoints of each curve. Retrieved from function flatten_curves.
+    - x: the concatenated X values of the curves.
+    - y: the concatenated Y values of the curves.
+    - grid_curves: the number of the curve of each grid timepoint.
+    - grid_x: the grid timepoints.
+
+    Returns:
+    - grid_y: the value of the curve at each of the grid timepoints.
+    '''
+    points, order = _curve_points(lengths, x)
+    last_known: np.ndarray = order[
+        np.searchsorted(points, grid_curves * 10080 + grid_x, side='right') - 1
+    ]
+
+    return y[last_known]
+
+def interp_curves(
+        lengths: np.ndarray,
+        x: np.ndarray,
+        y: np.ndarray,
+        grid_curves: np.ndarray,
+        grid_x: np.ndarray
+) -> np.ndarray:
+    '''
+    Linearly interpolates the curves at the grid timepoints.
+    All the curves are interpolated with a single np.interp. Each curve should contain X = 0
+    and X = 10079, so the interpolation only uses the timepoints of the same curve.
+
+    Parameters:
+    - lengths: the amount of timepoints of each curve. Retrieved from function flatten_curves.
+    - x: the concatenated X values of the curves.
+    - y: the concatenated Y values of the curves.
+    - grid_curves: the number of the curve of each grid timepoint.
+    - grid_x: the grid timepoints.
+
+    Returns:
+    - grid_y: the interpolated value of the curve at each of the grid timepoints.
+    '''
+    points, order = _curve_points(lengths, x)
+
+    return np.interp(grid_curves * 10080 + grid_x, points, y[order])
+
+def composite_key(data: pd.DataFrame, columns: list) -> np.ndarray:
+    '''
+    Combines multiple key columns into a single integer key, so a groupby on these columns only
+    has to hash one int64 column. Categorical columns use their category codes, other columns
+    are factorized. The codes are sorted, so ordering on the key is equal to ordering on the
+    columns.
+
+    Parameters:
+    - data: DataFrame containing the key columns.
+    - columns: list of the columns to combine into a single key.
+
+    Returns:
+    - key: int64 array with the composite key of each row of data. Rows with a missing value in
+    one of the columns get the key -1, they don't belong to any group.
+    '''
+    key: np.ndarray = np.zeros(data.shape[0], dtype=np.int64)
+    missing: np.ndarray = np.zeros(data.shape[0], dtype=bool)
+    for column in columns:
+        if isinstance(data[column].dtype, pd.CategoricalDtype):
+            codes = data[column].cat.codes.to_numpy(dtype=np.int64)
+            n_codes = len(data[column].cat.categories)
+        else:
+            codes, uniques = pd.factorize(data[column], sort=True)
+            n_codes = len(uniques)
+        key = key * n_codes + codes
+        missing |= codes < 0
+    key[missing] = -1
+
+    return key
+
+def same_categories(left: pd.Series, right: pd.Series) -> bool:
+    '''
+    Returns whether left and right are both categorical with the same categories in the same
+    order, so their codes are comparable. Unordered categorical dtypes compare equal regardless of
+    the order of their categories, so the dtypes can't be compared directly.
+    '''
+    return (
+        isinstance(left.dtype, pd.CategoricalDtype)
+        and isinstance(right.dtype, pd.CategoricalDtype)
+        and left.cat.categories.equals(right.cat.categories)
+    )
+
+def shared_composite_key(
+        left: pd.DataFrame, right: pd.DataFrame, columns: list
+    ) -> Tuple[np.ndarray, np.ndarray]:
+    '''
+    Combines multiple key columns of two DataFrames into single integer keys that are comparable
+    between both DataFrames, like the keys of a merge. Categorical columns with the same categories
+    in both DataFrames use their category codes, other columns are factorized over both DataFrames.
+    The codes are sorted, so ordering on the key is equal to ordering on the columns.
+
+    Parameters:
+    - left: DataFrame containing the key columns.
+    - right: DataFrame containing the key columns.
+    - columns: list of the columns to combine into a single key.
+
+    Returns:
+    - left_key: int64 array with the composite key of each row of left.
+    - right_key: int64 array with the composite key of each row of right.
+    Rows with a missing value in one of the columns get the key -1.
+    '''
+    left_key: np.ndarray = np.zeros(left.shape[0], dtype=np.int64)
+    right_key: np.ndarray = np.zeros(right.shape[0], dtype=np.int64)
+    left_missing: np.ndarray = np.zeros(left.shape[0], dtype=bool)
+    right_missing: np.ndarray = np.zeros(right.shape[0], dtype=bool)
+    for column in columns:
+        if same_categories(left[column], right[column]):
+            left_codes = left[column].cat.codes.to_numpy(dtype=np.int64)
+            right_codes = right[column].cat.codes.to_numpy(dtype=np.int64)
+            n_codes = len(left[column].cat.categories)
+        else:
+            codes, uniques = pd.factorize(
+                pd.concat([left[column], right[column]], ignore_index=True), sort=True
+            )
+            left_codes, right_codes = codes[:left.shape[0]], codes[left.shape[0]:]
+            n_codes = len(uniques)
+        left_key = left_key * n_codes + left_codes
+        right_key = right_key * n_codes + right_codes
+        left_missing |= left_codes < 0
+        right_missing |= right_codes < 0
+    left_key[left_missing] = -1
+    right_key[right_missing] = -1
+
+    return left_key, right_key
+
 def create_full_time_grid(consumption_curves: pd.DataFrame) -> pd.DataFrame:
     '''
     Retrieve a time grid with all minute timepoints for each week at each location.
@@ -122,12 +358,13 @@ def create_full_time_grid(consumption_curves: pd.DataFrame) -> pd.DataFrame:
         ]
     ]
 
-    time_range: pd.Series = pd.DataFrame(range(10080), columns=['X'])
-    time_point_grid = pd.merge(
-            locations_week.assign(key=1),
-            time_range.assign(key=1),
-            on='key'
-        ).drop('key', axis=1)
+    # Cross join each location and week with all the minutes in a week by repeating the rows.
+    time_point_grid: pd.DataFrame = (
+        locations_week
+        .iloc[np.repeat(np.arange(locations_week.shape[0]), 10080)]
+        .reset_index(drop=True)
+    )
+    time_point_grid['X'] = np.tile(np.arange(10080, dtype=np.int32), locations_week.shape[0])
 
     return time_point_grid
 
@@ -152,29 +389,59 @@ def interpolate_consumption_curves(
     value for CONSUMPTION_Y for the missing values.
     contains: "LOCATION", "CONSUMPTION_PROFILE_CURVE_ID", "WEEK_START", "X", "CONSUMPTION_Y"
     '''
+    curve_columns: list = ['LOCATION', 'CONSUMPTION_PROFILE_CURVE_ID', 'WEEK_START']
+    curve_keys: pd.MultiIndex = pd.MultiIndex.from_frame(consumption_curves[curve_columns])
+    if not curve_keys.is_unique:
+        raise ValueError(
+            "Input consumption_curves contains multiple curves for a LOCATION, "
+            "CONSUMPTION_PROFILE_CURVE_ID and WEEK_START"
+        )
+
+    consumption_points, lengths = flatten_curves(consumption_curves)
+
     # Check if the minimum and maximum of each X is equal to 0 and 10079
-    if consumption_curves[consumption_curves['X'].apply(min) != 0].shape[0] != 0:
+    x_min, x_max = curve_bounds(consumption_points['X'].to_numpy(), lengths)
+    if (x_min != 0).any():
         raise ValueError("Input consumption_curves contains X column with missing timepoint 0")
 
-    if consumption_curves[consumption_curves['X'].apply(max) != 10079].shape[0] != 0:
+    if (x_max != 10079).any():
         raise ValueError("Input consumption_curves contains X column with missing timepoint 10079")
 
-    consumption_curves = consumption_curves.explode(list('XY'))
-    consumption_curves['Y'] = consumption_curves['Y'].astype(float)
+    # Look up the curve of each row in the time_point_grid, via its distinct curve columns.
+    # Rows with a missing key share the key -1, they are looked up row by row instead.
+    grid_key: np.ndarray = composite_key(time_point_grid, curve_columns)
+    _, first_rows, grid_groups = np.unique(grid_key, return_index=True, return_inverse=True)
+    grid_curves: np.ndarray = curve_keys.get_indexer(
+        pd.MultiIndex.from_frame(time_point_grid[curve_columns].iloc[first_rows])
+    )[grid_groups]
+    missing_key: np.ndarray = grid_key == -1
+    if missing_key.any():
+        grid_curves[missing_key] = curve_keys.get_indexer(
+            pd.MultiIndex.from_frame(time_point_grid[curve_columns][missing_key])
+        )
 
-    consumption_curves = time_point_grid.merge(
-        consumption_curves,
-        how='left',
-        left_on=['LOCATION', 'CONSUMPTION_PROFILE_CURVE_ID', 'WEEK_START', 'X'],
-        right_on=['LOCATION', 'CONSUMPTION_PROFILE_CURVE_ID', 'WEEK_START', 'X']
+    consumption_y: np.ndarray = interp_curves(
+        lengths,
+        consumption_points['X'].to_numpy(dtype=float),
+        consumption_points['Y'].to_numpy(dtype=float),
+        grid_curves,
+        time_point_grid['X'].to_numpy(dtype=float)
     )
-    consumption_curves_interp: pd.DataFrame = consumption_curves.sort_values(
-        by=['LOCATION', 'WEEK_START', 'X']
+    # Timepoints of a location and week without a consumption curve can't be interpolated.
+    consumption_y[grid_curves == -1] = np.nan
+
+    # Sort on LOCATION, WEEK_START and X via their integer key instead of the columns. Rows with a
+    # missing LOCATION or WEEK_START are sorted last, like sort_values does.
+    location_week: np.ndarray = composite_key(time_point_grid, ['LOCATION', 'WEEK_START'])
+    location_week[location_week == -1] = location_week.max(initial=-1) + 1
+    order: np.ndarray = np.argsort(
+        location_week * 10080 + time_point_grid['X'].to_numpy(dtype=np.int64),
+        kind='stable'
     )
-    consumption_curves_interp['CONSUMPTION_Y'] = consumption_curves_interp['Y'].interpolate(
-        method='linear'
+    consumption_curves_interp: pd.DataFrame = (
+        time_point_grid
+        .assign(CONSUMPTION_Y=consumption_y.astype(np.float32))
+        .iloc[order]
     )
-    columns_to_drop: list = ['Y']
-    consumption_curves_interp.drop(columns=columns_to_drop, inplace=True)
 
     return consumption_curves_interp
@@ -1,6 +1,6 @@
 from pathlib import Path
 import pandas as pd
-from _db_connection import PgConnection
+from _db_connection import PgConnection, _psql_copy
 from _qos_read_write import read_config, read_qos_data
 
 def main():
@@ -20,8 +20,14 @@ def main():
     with PgConnection(**config['db']) as (engine, conn, cursor):
         cursor.execute(create_schema)
         cursor.execute(create_schema_qos)
-        qos_data.to_sql('qos_data', con=engine, schema='stg', if_exists='append', index=False)
-        qos_curves.to_sql('qos_curves', con=engine, schema='stg', if_exists='append', index=False)
+        qos_data.to_sql(
+            'qos_data', con=engine, schema='stg', if_exists='append', index=False,
+            method=_psql_copy
+        )
+        qos_curves.to_sql(
+            'qos_curves', con=engine, schema='stg', if_exists='append', index=False,
+            method=_psql_copy
+        )
 
     print("Schemas and tables created")
 
@@ -1,7 +1,7 @@
 import logging
 from pathlib import Path
 from datetime import datetime
-import traceback
+from typing import Optional
 import pandas as pd
 
 from _db_connection import PgConnection
@@ -9,7 +9,8 @@ from _logger import CustomLogger
 from _qos_read_write import (
     read_qos_data,
     read_config,
-    write_data
+    write_data,
+    cache_or_compute
 )
 from _qos_transformations import (
     transform_qos_data,
@@ -22,98 +23,163 @@ from _qos_metrics import (
     calc_quality_of_service
 )
 
-def main():
-    base_path: Path = Path(__file__).parent.parent
-    config_path = base_path / 'solution' / 'qos_config.json'
-
-    logging.info('Read config file.')
-    config = read_config(base_path, config_path)
-
-    if config['use_db']:
-        logging.info('Read input from database.')
-        db_connect = PgConnection(**config['db'])
-        db_connect.establish_connection()
-        qos_data, qos_curves = db_connect.db_read_qos_data(
-            qos_data_table=config['db_qos_data_table'],
-            qos_curves_table=config['db_qos_curves_table']
+logger = logging.getLogger('qos')
+
+def calculate_qos(
+        qos_data: pd.DataFrame,
+        qos_curves: pd.DataFrame,
+        use_cache: bool = False,
+        cache_folder: Optional[Path] = None,
+        read_cache_key: Optional[str] = None
+    ) -> pd.DataFrame:
+    '''
+    Calculates the quality of service per location and week from the qos_data and qos_curves.
+
+    Parameters:
+    - qos_data: The qos_data as read from the input.
+    - qos_curves: The qos_curves as read from the input.
+    - use_cache: Whether the transformed curves are cached in the cache_folder.
+    - cache_folder: The folder with the cached intermediate results.
+    - read_cache_key: The cache key of the read step that produced qos_data and qos_curves,
+    changes of the read step invalidate the cached transformed curves.
+
+    Returns:
+    - pd.DataFrame: The quality of service per location and week.
+    '''
+    # The counts are only needed for the log, so they are skipped when INFO is not logged.
+    if logger.isEnabledFor(logging.INFO):
+        number_of_locations = qos_data['LOCATION'].unique().shape[0]
+        number_of_weeks = qos_curves['WEEK_START'].unique().shape[0]
+        logger.info(
+            'qos_data contains %d Locations and %d weeks',
+            number_of_locations,
+            number_of_weeks,
+            extra={'locations': number_of_locations, 'weeks': number_of_weeks}
         )
-        db_connect.close_connection()
 
+    logger.info('Transform qos data.')
+    if use_cache:
+        (inventory_curves, consumption_curves), _ = cache_or_compute(
+            transform_qos_data,
+            cache_folder,
+            [],
+            depends_on=read_cache_key,
+            qos_data=qos_data,
+            qos_curves=qos_curves
+        )
     else:
-        logging.info('Read input csvs.')
-        qos_data, qos_curves = read_qos_data(input_folder=config['paths']['input'])
-
-    number_of_locations = qos_data['LOCATION'].unique().shape[0]
-    number_of_weeks = qos_curves['WEEK_START'].unique().shape[0]
-
-    logging.info(f'qos_data contains {number_of_locations} Locations and {number_of_weeks} weeks')
-
-    logging.info('Transform qos data.')
-    inventory_curves, consumption_curves = transform_qos_data(
-        qos_data=qos_data, qos_curves=qos_curves)
+        inventory_curves, consumption_curves = transform_qos_data(
+            qos_data=qos_data, qos_curves=qos_curves)
 
-    logging.info('Create product inventory.')
+    logger.info('Create product inventory.')
     product_inventory_grid = create_product_inventory(inventory_curves)
 
-    logging.info('Create full time grid.')
+    logger.info('Create full time grid.')
     time_point_grid = create_full_time_grid(consumption_curves)
 
-    logging.info('Calculate product availability ratio.')
+    logger.info('Calculate product availability ratio.')
     product_availability_ratio = calc_product_availability_ratio(
         product_inventory_grid,
         time_point_grid
     )
 
-    logging.info('Interpolate consumption curves datapoints.')
+    logger.info('Interpolate consumption curves datapoints.')
     consumption_curves_interp = interpolate_consumption_curves(
         consumption_curves,
         time_point_grid
     )
 
-    logging.info('Calculate quality of service.')    
-    qos = calc_quality_of_service(
+    logger.info('Calculate quality of service.')
+    return calc_quality_of_service(
         consumption_curves_interp,
         product_availability_ratio
     )
 
+def main():
+    base_path: Path = Path(__file__).parent.parent
+    config_path = base_path / 'solution' / 'qos_config.json'
+
+    logger.info('Read config file.')
+    config = read_config(base_path, config_path)
+
     if config['use_db']:
-        logging.info('Write data to database.')
-        db_connect.establish_connection()
-        db_connect.db_write_data(
-            data=qos,
-            target_table=config['db_output_table'],
-            target_schema=config['db_output_schema']
-        )
-        db_connect.close_connection()
+        # The connection is kept open for both the reads and the write, so it is only
+        # established once per run.
+        db_connect = PgConnection(**config['db'])
+        with db_connect:
+            logger.info('Read input from database.')
+            qos_data, qos_curves = db_connect.db_read_qos_data(
+                qos_data_table=config['db_qos_data_table'],
+                qos_curves_table=config['db_qos_curves_table']
+            )
+
+            qos = calculate_qos(qos_data, qos_curves)
+
+            logger.info('Write data to database.')
+            db_connect.db_write_data(
+                data=qos,
+                target_table=config['db_output_table'],
+                target_schema=config['db_output_schema'],
+                batch_size=config.get('db_batch_size')
+            )
 
     else:
-        logging.info('Write output data to csv file.')
+        # The intermediate results are only cached for the csv input, the database has no files
+        # to detect changes in the input data.
+        use_cache: bool = config.get('use_cache', False)
+
+        logger.info('Read input csvs.')
+        input_files = [
+            config['paths']['input'] / 'qos_data.csv',
+            config['paths']['input'] / 'qos_curves.csv'
+        ]
+        cache_folder: Optional[Path] = config['paths']['cache'] if use_cache else None
+        read_cache_key: Optional[str] = None
+        if use_cache:
+            (qos_data, qos_curves), read_cache_key = cache_or_compute(
+                read_qos_data,
+                cache_folder,
+                input_files,
+                input_folder=config['paths']['input']
+            )
+        else:
+            qos_data, qos_curves = read_qos_data(input_folder=config['paths']['input'])
+
+        qos = calculate_qos(
+            qos_data,
+            qos_curves,
+            use_cache=use_cache,
+            cache_folder=cache_folder,
+            read_cache_key=read_cache_key
+        )
+
+        logger.info('Write output data to csv file.')
         write_data(
             data=qos,
             filename='qos_output',
             output_path=config['paths']['output']
         )
 
-    logging.info('Quality of Service calculation finished succesfully.')
+    logger.info('Quality of Service calculation finished succesfully.')
 
 if __name__ == '__main__':
     current_date = datetime.now().strftime("%Y%m%d")
-    logger = CustomLogger(log_file=f"qos_{current_date}.log")
+    CustomLogger(log_file=f"qos_{current_date}.log", name='qos')
 
     try:
         main()
     except pd.errors.MergeError as me:
-        logging.error(f'MergeError occurred: {me}\n{traceback.format_exc()}')
+        logger.exception('MergeError occurred: %s', me)
         # Custom handling or logging for MergeError
         raise me  # Raise the exception again if needed
     except ValueError as ve:
-        logging.error(f'ValueError occurred: {ve}\n{traceback.format_exc()}')
+        logger.exception('ValueError occurred: %s', ve)
         # Custom handling or logging for ValueError
         raise ve  # Raise the exception again if needed
     except TypeError as te:
-        logging.error(f'TypeError occurred: {te}\n{traceback.format_exc()}')
+        logger.exception('TypeError occurred: %s', te)
         # Custom handling or logging for TypeError
         raise te  # Raise the exception again if needed
     except Exception as e:
-        logging.error(f'{e}\n{traceback.format_exc()}')
+        logger.exception('%s', e)
         raise
@@ -1,60 +1,285 @@
 '''
 This script launches a simple api webserver to serve the Quality of Service output.
 It will run locally on http://127.0.0.1:8000
-This is run in development mode. To run it in production a WSGI server should be used.
+This is run in development mode. To run it in production a WSGI server should be used with the
+entrypoint in wsgi.py.
 In addition additional measures such as security and authentication should be added.
 
 Contains the following endpoints:
-    - /qos serves as a general endpoint to get all QoS data.
+    - /qos serves as a general endpoint to get all QoS data. Clients that accept
+      'application/vnd.apache.arrow.stream' or request '/qos?format=arrow' receive the data as
+      an Arrow IPC stream. Clients that accept gzip receive the JSON compressed.
     - /qos/location/<location> allows filtering QoS data by location.
     - /qos/week/week_start provides filtering by date. The week_start should be in format: dd.mm.yyyy.
     - /qos/location/<location>/<week_start> offers combined filtering by both location and date.
 '''
 
-from flask import Flask, jsonify
+import gzip
+import hashlib
+from functools import cached_property
+from typing import Callable, List, Optional, Tuple, Union
+from flask import Blueprint, Flask, Response, current_app, request
+from flask.json.provider import JSONProvider
 from pathlib import Path
 from _qos_read_write import read_config
-import csv
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
 
-app = Flask(__name__)
+try:
+    import orjson
+except ImportError:
+    # orjson is optional, without it the responses are encoded with the json module.
+    orjson = None
 
-base_path: Path = Path(__file__).parent.parent
-config_path = base_path / 'solution' / 'qos_config.json'
-config = read_config(base_path, config_path)
-output_file = config['paths']['output'] / 'qos_output.csv'
-# Example data (replace this with your actual QoS data)
-qos_data = []
+class OrjsonProvider(JSONProvider):
+    '''
+    JSON provider that encodes and decodes with orjson, which is several times faster than the
+    json module. The keys are sorted like the default provider of flask.
+    '''
+    def dumps(self, obj, **kwargs) -> str:
+        return orjson.dumps(
+            obj, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_SORT_KEYS
+        ).decode('utf-8')
 
-with open(output_file, encoding='utf-8') as csvfile:
-    reader = csv.DictReader(csvfile)
-    for row in reader:
-        qos_data.append(row)
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
 
-@app.route('/qos', methods=['GET'])
+ARROW_MIMETYPE = 'application/vnd.apache.arrow.stream'
+# Number of seconds clients may cache a response, the output file doesn't change while serving.
+CACHE_MAX_AGE: int = 3600
+# The LOCATION and WEEK_START repeat for many rows, so they are dictionary encoded instead of
+# stored as a string per row.
+OUTPUT_COLUMN_TYPES: dict = {
+    'LOCATION': pa.dictionary(pa.int32(), pa.string()),
+    'WEEK_START': pa.dictionary(pa.int32(), pa.string()),
+    'QOS': pa.float64()
+}
+
+def read_qos_output(output_file: Path) -> pa.Table:
+    '''Reads the QoS output csv as an Arrow table with the OUTPUT_COLUMN_TYPES.'''
+    return pa_csv.read_csv(
+        output_file,
+        convert_options=pa_csv.ConvertOptions(column_types=OUTPUT_COLUMN_TYPES)
+    )
+
+def _group_rows(codes: np.ndarray) -> Tuple[np.ndarray, List[np.ndarray]]:
+    '''
+    Groups the row positions on integer codes. The stable sort keeps the rows of each group in
+    the order of the output file. Rows with the code -1 of a missing value are left out, they
+    can't be requested by the filtered endpoints.
+
+    Parameters:
+    - codes: The integer code of each row.
+
+    Returns:
+    - np.ndarray: The unique codes.
+    - List[np.ndarray]: The row positions of each unique code.
+    '''
+    order: np.ndarray = np.argsort(codes, kind='stable')
+    order = order[codes[order] >= 0]
+    unique_codes, starts = np.unique(codes[order], return_index=True)
+    return unique_codes, np.split(order, starts[1:])
+
+def _build_indexes(data: pd.DataFrame) -> Tuple[dict, dict, dict]:
+    '''
+    Builds the indexes with the row positions for each LOCATION, WEEK_START and the combination
+    of both. The rows are grouped on the integer codes of the columns instead of on the strings,
+    the combination uses the composite code location_code * number_of_weeks + week_code.
+
+    Parameters:
+    - data: The QoS data with the columns LOCATION and WEEK_START.
+
+    Returns:
+    - dict: The row positions per LOCATION.
+    - dict: The row positions per WEEK_START.
+    - dict: The row positions per (LOCATION, WEEK_START).
+    '''
+    location_codes, locations = pd.factorize(data['LOCATION'])
+    week_codes, weeks = pd.factorize(data['WEEK_START'])
+    location_week_codes: np.ndarray = np.where(
+        (location_codes >= 0) & (week_codes >= 0),
+        location_codes.astype(np.int64) * len(weeks) + week_codes,
+        -1
+    )
+
+    by_location: dict = {
+        locations[code]: rows for code, rows in zip(*_group_rows(location_codes))
+    }
+    by_week: dict = {
+        weeks[code]: rows for code, rows in zip(*_group_rows(week_codes))
+    }
+    by_location_week: dict = {
+        (locations[code // len(weeks)], weeks[code % len(weeks)]): rows
+        for code, rows in zip(*_group_rows(location_week_codes))
+    }
+    return by_location, by_week, by_location_week
+
+class QosResponses:
+    '''
+    Holds the QoS output that is served by the api, with the encoded responses of the endpoints.
+    The output doesn't change while serving, so each row is encoded as JSON once when the data is
+    loaded. The responses of the filtered endpoints are joined from these rows up front, so a
+    request only has to look up and send the bytes. The responses of /qos are joined on the
+    first request.
+
+    Parameters:
+    - table: The QoS output with the columns LOCATION, WEEK_START and QOS.
+    - dumps: Function that encodes an object as a JSON string.
+    '''
+    def __init__(self, table: pa.Table, dumps: Callable[[object], str]):
+        self.table = table
+        self.data: pd.DataFrame = table.to_pandas()
+        self.row_json: List[bytes] = [
+            dumps(record).encode('utf-8') for record in self.data.to_dict(orient='records')
+        ]
+
+        # Indexes with the row positions, so a request doesn't have to scan all the rows.
+        rows_by_location, rows_by_week, rows_by_location_week = _build_indexes(self.data)
+
+        self.empty_json: Tuple[bytes, str] = self._join_rows([])
+        self.json_by_location: dict = {
+            location: self._join_rows(rows) for location, rows in rows_by_location.items()
+        }
+        self.json_by_week: dict = {
+            week_start: self._join_rows(rows) for week_start, rows in rows_by_week.items()
+        }
+        self.json_by_location_week: dict = {
+            key: self._join_rows(rows) for key, rows in rows_by_location_week.items()
+        }
+
+    def _join_rows(self, rows) -> Tuple[bytes, str]:
+        '''
+        Returns a JSON array of the encoded rows at the positions rows, together with the ETag of
+        the array.
+        '''
+        body: bytes = b'[' + b','.join([self.row_json[row] for row in rows]) + b']'
+        return body, hashlib.sha1(body).hexdigest()
+
+    @cached_property
+    def all_json(self) -> Tuple[bytes, str]:
+        '''All the QoS data encoded as JSON, with its ETag.'''
+        return self._join_rows(range(len(self.row_json)))
+
+    @cached_property
+    def all_json_gzip(self) -> Tuple[bytes, str]:
+        '''All the QoS data encoded as gzip compressed JSON, with its ETag.'''
+        body, etag = self.all_json
+        return gzip.compress(body, compresslevel=6), f'{etag}-gzip'
+
+    @cached_property
+    def all_arrow(self) -> Tuple[bytes, str]:
+        '''All the QoS data as an Arrow IPC stream, with its ETag.'''
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, self.table.schema) as writer:
+            for batch in self.table.to_batches(max_chunksize=64_000):
+                writer.write_batch(batch)
+        body: bytes = sink.getvalue().to_pybytes()
+        return body, hashlib.sha1(body).hexdigest()
+
+# The endpoints are registered on a blueprint, so each app created by create_app gets them.
+api = Blueprint('qos', __name__)
+
+def create_app(qos_data: Optional[Union[pa.Table, List[dict]]] = None) -> Flask:
+    '''
+    Creates the api app that serves the QoS data.
+
+    Parameters:
+    - qos_data: The QoS data to serve, as an Arrow table or as a list of rows with the keys
+    LOCATION, WEEK_START and QOS. By default the qos_output.csv in the output folder of the
+    config is served.
+
+    Returns:
+    - Flask: The api app.
+    '''
+    app = Flask(__name__)
+    if orjson is not None:
+        app.json = OrjsonProvider(app)
+
+    if qos_data is None:
+        base_path: Path = Path(__file__).parent.parent
+        config_path = base_path / 'solution' / 'qos_config.json'
+        config = read_config(base_path, config_path)
+        qos_data = read_qos_output(config['paths']['output'] / 'qos_output.csv')
+    elif isinstance(qos_data, list):
+        qos_data = pa.Table.from_pylist(qos_data)
+
+    app.extensions['qos'] = QosResponses(qos_data, app.json.dumps)
+    app.register_blueprint(api)
+    return app
+
+def _qos() -> QosResponses:
+    '''Returns the QoS responses of the current app.'''
+    return current_app.extensions['qos']
+
+def _cached_response(
+        body: bytes,
+        etag: str,
+        mimetype: str = 'application/json',
+        content_encoding: str = None,
+        vary: Tuple[str, ...] = ()
+    ) -> Response:
+    '''
+    Returns a response with a precomputed body and its ETag and Cache-Control headers.
+    Requests with an If-None-Match header that matches the ETag get a 304 without a body.
+
+    Parameters:
+    - body: The encoded response body.
+    - etag: The ETag of the body.
+    - mimetype: The mimetype of the body.
+    - content_encoding: The encoding of a compressed body, e.g. 'gzip'.
+    - vary: The request headers the body depends on, so shared caches keep a response per value.
+
+    Returns:
+    - Response: The response to return from the endpoint.
+    '''
+    response = Response(body, mimetype=mimetype)
+    if content_encoding:
+        response.content_encoding = content_encoding
+        response.vary.add('Accept-Encoding')
+    response.vary.update(vary)
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = CACHE_MAX_AGE
+    return response.make_conditional(request)
+
+@api.route('/qos', methods=['GET'])
 def get_qos_data():
-    '''Endpoint to get all QoS data'''
-    return jsonify(qos_data)
+    '''
+    Endpoint to get all QoS data, as JSON or as an Arrow IPC stream. The JSON is sent gzip
+    compressed to clients that accept it.
+    '''
+    # The response depends on the Accept and Accept-Encoding headers of the request.
+    vary = ('Accept', 'Accept-Encoding')
+    accepts_arrow = request.accept_mimetypes.best_match(['application/json', ARROW_MIMETYPE])
+    if request.args.get('format') == 'arrow' or accepts_arrow == ARROW_MIMETYPE:
+        return _cached_response(*_qos().all_arrow, mimetype=ARROW_MIMETYPE, vary=vary)
+    if request.accept_encodings['gzip'] > 0:
+        return _cached_response(*_qos().all_json_gzip, content_encoding='gzip', vary=vary)
+    return _cached_response(*_qos().all_json, vary=vary)
 
-@app.route('/qos/location/<location>', methods=['GET'])
+@api.route('/qos/location/<location>', methods=['GET'])
 def get_qos_by_location(location):
     '''Endpoint to get QoS data by location'''
-    result = [i for i in qos_data if i['LOCATION'] == location]
-    return jsonify(result)
+    qos = _qos()
+    return _cached_response(*qos.json_by_location.get(location, qos.empty_json))
 
-@app.route('/qos/location/<location>/<week_start>', methods=['GET'])
+@api.route('/qos/location/<location>/<week_start>', methods=['GET'])
 def get_qos_by_location_and_date(location, week_start):
     '''Endpoint to get QoS data by location and date'''
-    location = [i for i in qos_data if i['LOCATION'] == location]
-    result = [i for i in location if i['WEEK_START'] == week_start]
-    return jsonify(result)
+    qos = _qos()
+    return _cached_response(
+        *qos.json_by_location_week.get((location, week_start), qos.empty_json)
+    )
 
 
-@app.route('/qos/week/<week_start>', methods=['GET'])
+@api.route('/qos/week/<week_start>', methods=['GET'])
 def get_qos_by_date(week_start):
     '''Endpoint to get QoS data by week_start'''
-    result = [i for i in qos_data if i['WEEK_START'] == week_start]
-    return jsonify(result)
+    qos = _qos()
+    return _cached_response(*qos.json_by_week.get(week_start, qos.empty_json))
 
 
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    create_app().run(debug=True)
\ No newline at end of file
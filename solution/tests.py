@@ -1,7 +1,100 @@
+'''
+Runs the test_*.py files in the tests folder. The test classes are independent of each other,
+so they are run in parallel over multiple processes.
+
+Usage: python solution/tests.py [--jobs N] [--failfast]
+'''
+import argparse
+import io
+import os
+import sys
 import unittest
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import List, Tuple
+
+TEST_FOLDER = 'solution/tests'
+TEST_PATTERN = 'test_*.py'
+
+def _test_classes() -> List[unittest.TestSuite]:
+    '''
+    Discovers the tests and groups them per test class, so the setUpClass of a class runs once.
+    The order is deterministic, so each worker process can discover the same groups.
+    '''
+    groups: dict = {}
+    stack = [unittest.TestLoader().discover(TEST_FOLDER, pattern=TEST_PATTERN)]
+    while stack:
+        suite = stack.pop(0)
+        for test in suite:
+            if isinstance(test, unittest.TestSuite):
+                stack.append(test)
+            else:
+                groups.setdefault(type(test), unittest.TestSuite()).addTest(test)
+    return list(groups.values())
+
+def _run_test_class(index: int, failfast: bool) -> Tuple[str, int, int, int, int]:
+    '''
+    Runs the test class at position index of the discovered test classes.
+
+    Returns:
+    - str: The output of the test runner.
+    - int: The number of tests run.
+    - int: The number of failures.
+    - int: The number of errors.
+    - int: The number of skipped tests.
+    '''
+    stream = io.StringIO()
+    runner = unittest.TextTestRunner(stream=stream, failfast=failfast)
+    result = runner.run(_test_classes()[index])
+    return (
+        stream.getvalue(),
+        result.testsRun,
+        len(result.failures),
+        len(result.errors),
+        len(result.skipped)
+    )
+
+def main() -> bool:
+    parser = argparse.ArgumentParser(description='Runs the unit tests of the qos calculation.')
+    parser.add_argument(
+        '-j', '--jobs', type=int, default=os.cpu_count() or 1,
+        help='Number of processes to run the test classes in, defaults to the number of cpus.'
+    )
+    parser.add_argument(
+        '-f', '--failfast', action='store_true', help='Stop on the first failure or error.'
+    )
+    args = parser.parse_args()
+
+    if args.jobs <= 1:
+        tests = unittest.TestLoader().discover(TEST_FOLDER, pattern=TEST_PATTERN)
+        test_runner = unittest.TextTestRunner(failfast=args.failfast)
+        return test_runner.run(tests).wasSuccessful()
+
+    tests_run = failures = errors = skipped = 0
+    number_of_classes = len(_test_classes())
+    with ProcessPoolExecutor(max_workers=min(args.jobs, number_of_classes)) as executor:
+        futures = [
+            executor.submit(_run_test_class, index, args.failfast)
+            for index in range(number_of_classes)
+        ]
+        for future in as_completed(futures):
+            output, run, failed, errored, skip = future.result()
+            sys.stderr.write(output)
+            tests_run += run
+            failures += failed
+            errors += errored
+            skipped += skip
+            if args.failfast and (failed or errored):
+                for pending in futures:
+                    pending.cancel()
+                break
+
+    summary = f'Ran {tests_run} tests in {number_of_classes} test classes: '
+    if failures or errors:
+        summary += f'FAILED (failures={failures}, errors={errors}, skipped={skipped})'
+    else:
+        summary += f'OK (skipped={skipped})'
+    sys.stderr.write(summary + '\n')
+    return not (failures or errors)
 
 if __name__ == '__main__':
-    loader = unittest.TestLoader()
-    tests = loader.discover('solution/tests', pattern='test_*.py')
-    test_runner = unittest.TextTestRunner()
-    result = test_runner.run(tests)
\ No newline at end of file
+    sys.exit(not main())
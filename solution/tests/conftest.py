@@ -0,0 +1,28 @@
+'''
+Contains the shared helpers of the unit tests to load and prepare the test data.
+'''
+from functools import lru_cache
+from pathlib import Path
+import pandas as pd
+
+TEST_DATA_FOLDER: Path = Path(__file__).parent / 'test_data'
+
+@lru_cache(maxsize=None)
+def load_fixture(file_name: str) -> pd.DataFrame:
+    '''
+    Loads a parquet file from the test_data folder once per test run. The files store the dtypes
+    of the columns and the curves in X and Y as arrays, so nothing has to be parsed or inferred.
+    The returned DataFrame is shared between all test classes, so tests should pass a .copy() to
+    the functions they test.
+
+    Parameters:
+    - file_name: Name of the parquet file in the test_data folder.
+
+    Returns:
+    - pd.DataFrame: The loaded test data.
+    '''
+    return pd.read_parquet(TEST_DATA_FOLDER / file_name, engine='pyarrow')
+
+def as_object_keys(data: pd.DataFrame, columns: list) -> pd.DataFrame:
+    '''Returns a copy of data with the categorical key columns converted to object columns.'''
+    return data.astype({column: object for column in columns})
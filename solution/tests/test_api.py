@@ -1,27 +1,90 @@
+import gzip
+import json
 import unittest
-from qos_api import app  # Assuming the Flask app is in a file named 'app.py'
+import pyarrow as pa
+
+from qos_api import create_app, ARROW_MIMETYPE
+
+QOS_DATA = [
+    {'LOCATION': 'Advanced Building', 'WEEK_START': '12.06.2023', 'QOS': 0.9},
+    {'LOCATION': 'Advanced Building', 'WEEK_START': '19.06.2023', 'QOS': 0.8},
+    {'LOCATION': 'Medicine West', 'WEEK_START': '12.06.2023', 'QOS': 0.7}
+]
 
 class TestFlaskAPI(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # Serve the synthetic data instead of the output of the qos calculation.
+        cls.flask_app = create_app(qos_data=QOS_DATA)
+
     def setUp(self):
-        self.app = app.test_client()
+        self.app = self.flask_app.test_client()
         self.app.testing = True
 
     def test_get_qos_data(self):
         response = self.app.get('/qos')
         self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json(), QOS_DATA)
+
+    def test_get_qos_data_vary(self):
+        for headers in [{}, {'Accept-Encoding': 'gzip'}, {'Accept': ARROW_MIMETYPE}]:
+            response = self.app.get('/qos', headers=headers)
+            self.assertEqual(set(response.vary), {'Accept', 'Accept-Encoding'})
+
+    def test_get_qos_data_arrow_accept(self):
+        response = self.app.get('/qos', headers={'Accept': ARROW_MIMETYPE})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, ARROW_MIMETYPE)
+        table = pa.ipc.open_stream(response.data).read_all()
+        self.assertEqual(table.to_pylist(), QOS_DATA)
+
+    def test_get_qos_data_arrow_format(self):
+        response = self.app.get('/qos?format=arrow')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, ARROW_MIMETYPE)
+        table = pa.ipc.open_stream(response.data).read_all()
+        self.assertEqual(table.to_pylist(), QOS_DATA)
+
+    def test_get_qos_data_gzip(self):
+        response = self.app.get('/qos', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(json.loads(gzip.decompress(response.data)), QOS_DATA)
+
+    def test_get_qos_data_not_modified(self):
+        etag = self.app.get('/qos').headers['ETag']
+        response = self.app.get('/qos', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b'')
 
     def test_get_qos_by_location(self):
         location = 'Advanced Building'
         response = self.app.get(f'/qos/location/{location}')
         self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json(), QOS_DATA[:2])
 
     def test_get_qos_by_location_and_date(self):
         location = 'Advanced Building'
         week_start = '12.06.2023'
         response = self.app.get(f'/qos/location/{location}/{week_start}')
         self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json(), QOS_DATA[:1])
 
     def test_get_qos_by_date(self):
         week_start = '12.06.2023'
         response = self.app.get(f'/qos/week/{week_start}')
         self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json(), [QOS_DATA[0], QOS_DATA[2]])
+
+    def test_get_qos_missing_values(self):
+        qos_data = QOS_DATA + [
+            {'LOCATION': None, 'WEEK_START': '19.06.2023', 'QOS': 0.6},
+            {'LOCATION': 'Medicine West', 'WEEK_START': None, 'QOS': 0.5}
+        ]
+        app = create_app(qos_data=qos_data).test_client()
+        self.assertEqual(app.get('/qos').get_json(), qos_data)
+        self.assertEqual(
+            app.get('/qos/location/Medicine West').get_json(), [QOS_DATA[2], qos_data[4]]
+        )
+        self.assertEqual(app.get('/qos/week/19.06.2023').get_json(), [QOS_DATA[1], qos_data[3]])
+        self.assertEqual(app.get('/qos/location/Medicine West/19.06.2023').get_json(), [])
@@ -0,0 +1,61 @@
+import unittest
+from types import SimpleNamespace
+import numpy as np
+import pandas as pd
+
+from _db_connection import _psql_copy, PgConnection
+
+
+class FakeCursor:
+    '''Cursor that stores the statement and data of copy_expert instead of sending them.'''
+    def __init__(self):
+        self.sql = None
+        self.data = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+    def copy_expert(self, sql, buffer):
+        self.sql = sql
+        self.data = buffer.read()
+
+
+class TestPsqlCopy(unittest.TestCase):
+    '''
+    Contains the unit tests for the function _psql_copy
+    '''
+    def setUp(self):
+        self.cursor = FakeCursor()
+        self.conn = SimpleNamespace(connection=SimpleNamespace(cursor=lambda: self.cursor))
+        self.pd_table = SimpleNamespace(schema='stg', name='qos_curves')
+
+    def test_copy_statement(self):
+        '''test if the COPY statement contains the table and the quoted columns.'''
+        _psql_copy(self.pd_table, self.conn, ['LOCATION', 'X'], [('A', [0, 1])])
+        self.assertEqual(
+            self.cursor.sql, 'COPY stg.qos_curves ("LOCATION", "X") FROM STDIN WITH CSV'
+        )
+
+    def test_list_values(self):
+        '''test if lists and tuples are written as postgres array literals.'''
+        _psql_copy(self.pd_table, self.conn, ['X', 'Y'], [([0, 500, 10079], (0.0, 2.5, 1.0))])
+        self.assertEqual(self.cursor.data, '"{0,500,10079}","{0.0,2.5,1.0}"\r\n')
+
+    def test_ndarray_values(self):
+        '''
+        test if numpy arrays are written as postgres array literals, also for long arrays that
+        numpy would summarize in its repr, and can be read back by _convert_curves.
+        '''
+        x = np.arange(2000, dtype=np.float32)
+        _psql_copy(self.pd_table, self.conn, ['LOCATION', 'X'], [('A', x)])
+        location, x_text = self.cursor.data.rstrip('\r\n').split(',', 1)
+        self.assertEqual(location, 'A')
+        self.assertNotIn('\n', x_text)
+        self.assertNotIn('...', x_text)
+
+        curves = pd.DataFrame({'X': [x_text.strip('"')], 'Y': [x_text.strip('"')]})
+        converted = PgConnection._convert_curves(curves)
+        np.testing.assert_array_equal(converted['X'][0], x)
@@ -1,8 +1,8 @@
 import unittest
-from pathlib import Path
-from ast import literal_eval
 import pandas as pd
 
+from tests.conftest import load_fixture, as_object_keys
+
 from _qos_metrics import (
     create_product_inventory,
     calc_product_availability_ratio,
@@ -15,21 +15,11 @@ class TestCreateProductInventory(unittest.TestCase):
     '''
     Contains the unit tests for the function create_product_inventory
     '''
-    def setUp(self):
-        # Load test data from test_data folder.
-        self.test_folder = Path(__file__).parent / 'test_data'
-        self.inventory_curves = pd.read_csv(self.test_folder / 'test_inventory_curves.csv')
-        # Convert the X and Y columns to lists.
-        self.inventory_curves['X'] = [
-            literal_eval(item) for item in self.inventory_curves['X']
-        ]
-        self.inventory_curves['Y'] = [
-            literal_eval(item) for item in self.inventory_curves['Y']
-        ]
-
-        self.product_inventory_grid = pd.read_csv(
-            self.test_folder / 'test_product_inventory_grid.csv'
-        )
+    @classmethod
+    def setUpClass(cls):
+        # Load test data from test_data folder once for all tests of the class.
+        cls.inventory_curves = load_fixture('test_inventory_curves.parquet')
+        cls.product_inventory_grid = load_fixture('test_product_inventory_grid.parquet')
 
     def test_output_datatype(self):
         '''test if the output is of datatype DataFrame.'''
@@ -62,6 +52,33 @@ class TestCreateProductInventory(unittest.TestCase):
             check_dtype=False
         )
 
+    def test_unsorted_x(self):
+        '''test if unsorted X within a curve gives the same product_inventory_grid.'''
+        inventory_curves = self.inventory_curves.copy()
+        inventory_curves['X'] = [x[::-1] for x in inventory_curves['X']]
+        inventory_curves['Y'] = [y[::-1] for y in inventory_curves['Y']]
+        product_inventory_grid = create_product_inventory(inventory_curves)
+        product_inventory_grid.reset_index(drop=True, inplace=True)
+
+        assert_frame_equal(
+            self.product_inventory_grid,
+            product_inventory_grid,
+            check_dtype=False
+        )
+
+    def test_missing_keys(self):
+        '''test if curves with a missing LOCATION or WEEK_START are left out of the grid.'''
+        location = self.inventory_curves['LOCATION'].iloc[0]
+        inventory_curves = self.inventory_curves.copy()
+        inventory_curves.loc[inventory_curves['LOCATION'] == location, 'WEEK_START'] = None
+        product_inventory_grid = create_product_inventory(inventory_curves)
+        product_inventory_grid.reset_index(drop=True, inplace=True)
+        expected = self.product_inventory_grid[
+            self.product_inventory_grid['LOCATION'] != location
+        ].reset_index(drop=True)
+
+        assert_frame_equal(expected, product_inventory_grid, check_dtype=False)
+
     def test_incorrect_input_type(self):
         '''test if the correct error is raised in case of an incorrect input type.'''
         dict_input = {}
@@ -80,11 +97,11 @@ class TestCalcProductAvailabilityRatio(unittest.TestCase):
     '''
     Contains the unit tests for the function calc_product_availability_ratio.
     '''
-    def setUp(self):
-        # Load test data from test_data folder.
-        self.test_folder = Path(__file__).parent / 'test_data'
-        self.product_inventory_grid = pd.read_csv(self.test_folder / 'test_product_inventory_grid.csv')
-        self.time_point_grid = pd.read_csv(self.test_folder / 'test_time_point_grid.csv')
+    @classmethod
+    def setUpClass(cls):
+        # Load test data from test_data folder once for all tests of the class.
+        cls.product_inventory_grid = load_fixture('test_product_inventory_grid.parquet')
+        cls.time_point_grid = load_fixture('test_time_point_grid.parquet')
 
     def test_output_datatype(self):
         '''test if the output is of datatype DataFrame.'''
@@ -137,12 +154,58 @@ class TestCalcProductAvailabilityRatio(unittest.TestCase):
             0
         )
 
+    def test_non_categorical_keys(self):
+        '''test if key columns that are not categorical give the same output.'''
+        key_columns = ['LOCATION', 'WEEK_START']
+        expected = calc_product_availability_ratio(
+            self.product_inventory_grid.copy(),
+            self.time_point_grid.copy()
+            )
+        product_availability_ratio = calc_product_availability_ratio(
+            as_object_keys(self.product_inventory_grid, key_columns),
+            as_object_keys(self.time_point_grid, key_columns)
+            )
+        assert_frame_equal(product_availability_ratio, as_object_keys(expected, key_columns))
+
+    def test_missing_keys(self):
+        '''test if rows with a missing LOCATION or WEEK_START don't get the ratio of another row.'''
+        expected = calc_product_availability_ratio(
+            self.product_inventory_grid.copy(),
+            self.time_point_grid.copy()
+            )
+        location = self.time_point_grid['LOCATION'].iloc[0]
+        product_inventory_grid = self.product_inventory_grid.copy()
+        time_point_grid = self.time_point_grid.copy()
+        product_inventory_grid.loc[
+            product_inventory_grid['LOCATION'] == location, 'WEEK_START'
+        ] = None
+        time_point_grid.loc[time_point_grid['LOCATION'] == location, 'WEEK_START'] = None
+        product_availability_ratio = calc_product_availability_ratio(
+            product_inventory_grid,
+            time_point_grid
+            )
+        missing = product_availability_ratio['WEEK_START'].isna()
+        self.assertTrue(product_availability_ratio.loc[missing, 'PA_RATIO'].isna().all())
+        assert_frame_equal(
+            product_availability_ratio[~missing],
+            expected[expected['LOCATION'] != location]
+        )
+
+    def test_duplicate_time_point_grid(self):
+        '''test if the correct error is raised for duplicate rows in the time_point_grid.'''
+        time_point_grid = pd.concat([self.time_point_grid, self.time_point_grid.iloc[:1]])
+        with self.assertRaises(pd.errors.MergeError):
+            calc_product_availability_ratio(self.product_inventory_grid.copy(), time_point_grid)
+
 class TestCalcQualityOfService(unittest.TestCase):
-    def setUp(self):
-        # Load test data from test_data folder.
-        self.test_folder = Path(__file__).parent / 'test_data'
-        self.product_availability_ratio = pd.read_csv(self.test_folder / 'test_product_availability_ratio.csv')
-        self.consumption_curves_interp = pd.read_csv(self.test_folder / 'test_consumption_curves_interp.csv')
+    '''
+    Contains the unit tests for the function calc_quality_of_service.
+    '''
+    @classmethod
+    def setUpClass(cls):
+        # Load test data from test_data folder once for all tests of the class.
+        cls.product_availability_ratio = load_fixture('test_product_availability_ratio.parquet')
+        cls.consumption_curves_interp = load_fixture('test_consumption_curves_interp.parquet')
 
     def test_output_datatype(self):
         '''test if the output is of datatype DataFrame.'''
@@ -184,3 +247,68 @@ class TestCalcQualityOfService(unittest.TestCase):
             qos[qos['QOS'].isnull()].shape[0],
             0
         )
+
+    def test_unaligned_input(self):
+        '''test if inputs in a different row order give the same qos.'''
+        expected = calc_quality_of_service(
+            self.consumption_curves_interp.copy(),
+            self.product_availability_ratio.copy()
+            )
+        qos = calc_quality_of_service(
+            self.consumption_curves_interp.iloc[::-1],
+            self.product_availability_ratio.copy()
+            )
+        assert_frame_equal(qos, expected)
+
+    def test_non_categorical_keys(self):
+        '''test if key columns that are not categorical give the same qos.'''
+        key_columns = ['LOCATION', 'WEEK_START']
+        expected = calc_quality_of_service(
+            self.consumption_curves_interp.copy(),
+            self.product_availability_ratio.copy()
+            )
+        qos = calc_quality_of_service(
+            as_object_keys(self.consumption_curves_interp, key_columns),
+            as_object_keys(self.product_availability_ratio, key_columns)
+            )
+        self.assertEqual(qos.index.tolist(), expected.index.tolist())
+        self.assertEqual(qos['QOS'].tolist(), expected['QOS'].tolist())
+
+    def test_different_categories(self):
+        '''test if inputs with differently ordered categories give the same qos.'''
+        expected = calc_quality_of_service(
+            self.consumption_curves_interp.copy(),
+            self.product_availability_ratio.copy()
+            )
+        product_availability_ratio = self.product_availability_ratio.iloc[::-1].copy()
+        product_availability_ratio['LOCATION'] = (
+            product_availability_ratio['LOCATION']
+            .cat.reorder_categories(product_availability_ratio['LOCATION'].cat.categories[::-1])
+        )
+        qos = calc_quality_of_service(
+            self.consumption_curves_interp.copy(),
+            product_availability_ratio
+            )
+        assert_frame_equal(qos, expected)
+
+    def test_misaligned_input(self):
+        '''test if the correct error is raised for inputs that don't match one-to-one.'''
+        with self.assertRaises(pd.errors.MergeError):
+            calc_quality_of_service(
+                self.consumption_curves_interp.iloc[1:],
+                self.product_availability_ratio.iloc[:-1]
+                )
+
+    def test_missing_keys(self):
+        '''test if rows with a missing LOCATION or WEEK_START are left out of the qos.'''
+        expected = calc_quality_of_service(
+            self.consumption_curves_interp.copy(),
+            self.product_availability_ratio.copy()
+            )
+        consumption_curves_interp = self.consumption_curves_interp.copy()
+        product_availability_ratio = self.product_availability_ratio.copy()
+        location = consumption_curves_interp['LOCATION'].iloc[-1]
+        for data in [consumption_curves_interp, product_availability_ratio]:
+            data.loc[data['LOCATION'] == location, 'WEEK_START'] = None
+        qos = calc_quality_of_service(consumption_curves_interp, product_availability_ratio)
+        assert_frame_equal(qos, expected[expected.index.get_level_values('LOCATION') != location])
@@ -0,0 +1,138 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+import pandas as pd
+from pandas.testing import assert_frame_equal
+
+from _qos_read_write import cache_key, cache_or_compute, read_config
+
+CALLS: list = []
+
+def compute_data(source_file: Path, factor: int = 1):
+    '''Reads the number in source_file and records the call, to count the computations.'''
+    CALLS.append(factor)
+    value = int(source_file.read_text())
+    # Parquet doesn't keep categoricals with integer categories, these should still be cached.
+    categories = pd.DataFrame({
+        'B': pd.Categorical([factor], categories=[1, 2, 3]),
+        'C': pd.Categorical(['a'], categories=['b', 'a'])
+    })
+    return pd.DataFrame({'A': [value * factor]}), categories
+
+def transform_data(data: pd.DataFrame):
+    '''Doubles the column A of data and records the call.'''
+    CALLS.append('transform')
+    return (data.assign(A=data['A'] * 2),)
+
+
+class TestCacheOrCompute(unittest.TestCase):
+    '''
+    Contains the unit tests for the function cache_or_compute
+    '''
+    def setUp(self):
+        CALLS.clear()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache_folder = Path(self.temp_dir.name) / 'cache'
+        self.source_file = Path(self.temp_dir.name) / 'source.txt'
+        self.source_file.write_text('1')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def compute(self, factor: int = 1):
+        return cache_or_compute(
+            compute_data,
+            self.cache_folder,
+            [self.source_file],
+            source_file=self.source_file,
+            factor=factor
+        )
+
+    def test_cache_miss(self):
+        '''test if the output is computed and written to the cache folder on a miss.'''
+        result, _ = self.compute()
+        self.assertEqual(CALLS, [1])
+        self.assertEqual(len(list(self.cache_folder.glob('compute_data_*/*.parquet'))), 2)
+        assert_frame_equal(result[0], pd.DataFrame({'A': [1]}))
+
+    def test_cache_hit(self):
+        '''test if a second call reads the cached output instead of computing it.'''
+        expected, expected_key = self.compute()
+        result, key = self.compute()
+        self.assertEqual(CALLS, [1])
+        self.assertEqual(key, expected_key)
+        self.assertEqual(len(result), len(expected))
+        for cached, computed in zip(result, expected):
+            assert_frame_equal(cached, computed)
+
+    def test_invalidation_source_file(self):
+        '''test if a change of a source file invalidates the cache.'''
+        self.compute()
+        self.source_file.write_text('22')
+        result, _ = self.compute()
+        self.assertEqual(CALLS, [1, 1])
+        assert_frame_equal(result[0], pd.DataFrame({'A': [22]}))
+
+    def test_invalidation_arguments(self):
+        '''test if other arguments invalidate the cache.'''
+        self.compute(factor=1)
+        result, _ = self.compute(factor=3)
+        self.assertEqual(CALLS, [1, 3])
+        assert_frame_equal(result[0], pd.DataFrame({'A': [3]}))
+
+    def test_returned_key(self):
+        '''test if the returned key is the cache key of the output.'''
+        _, key = self.compute(factor=2)
+        self.assertEqual(
+            key, cache_key(compute_data, [self.source_file], source_file=self.source_file, factor=2)
+        )
+
+    def test_invalidation_depends_on(self):
+        '''test if a changed key of the step that computed the DataFrame arguments invalidates.'''
+        data = pd.DataFrame({'A': [1]})
+        cache_or_compute(transform_data, self.cache_folder, [], depends_on='read_1', data=data)
+        cache_or_compute(transform_data, self.cache_folder, [], depends_on='read_1', data=data)
+        self.assertEqual(CALLS, ['transform'])
+        cache_or_compute(transform_data, self.cache_folder, [], depends_on='read_2', data=data)
+        self.assertEqual(CALLS, ['transform', 'transform'])
+
+    def test_dataframe_argument_without_depends_on(self):
+        '''test if the correct error is raised for a DataFrame argument without depends_on.'''
+        with self.assertRaises(ValueError):
+            cache_or_compute(transform_data, self.cache_folder, [], data=pd.DataFrame({'A': [1]}))
+
+class TestReadConfig(unittest.TestCase):
+    '''
+    Contains the unit tests for the function read_config
+    '''
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.base_path = Path(self.temp_dir.name)
+        (self.base_path / 'raw_data').mkdir()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def write_config(self, file_name: str, config: dict) -> Path:
+        config_path = self.base_path / file_name
+        config_path.write_text(json.dumps(config), encoding='utf-8')
+        return config_path
+
+    def test_cache_path(self):
+        '''test if the cache path is converted to an absolute path.'''
+        config_path = self.write_config('cache.json', {
+            'use_cache': True,
+            'paths': {'input': 'raw_data', 'output': 'output', 'cache': 'cache'}
+        })
+        config = read_config(self.base_path, config_path)
+        self.assertEqual(config['paths']['cache'], self.base_path / 'cache')
+
+    def test_missing_cache_path(self):
+        '''test if the correct error is raised for use_cache without a cache path.'''
+        config_path = self.write_config('no_cache.json', {
+            'use_cache': True,
+            'paths': {'input': 'raw_data', 'output': 'output'}
+        })
+        with self.assertRaises(ValueError):
+            read_config(self.base_path, config_path)
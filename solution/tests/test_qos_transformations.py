@@ -1,25 +1,257 @@
 import unittest
-from pathlib import Path
-from ast import literal_eval
+import numpy as np
 import pandas as pd
+from pandas.testing import assert_frame_equal
 
-from _qos_transformations import create_full_time_grid, interpolate_consumption_curves
+from tests.conftest import load_fixture, as_object_keys
+
+from _qos_transformations import (
+    flatten_curves,
+    curve_bounds,
+    step_curves,
+    interp_curves,
+    composite_key,
+    shared_composite_key,
+    transform_qos_data,
+    create_full_time_grid,
+    interpolate_consumption_curves
+)
+
+class TestFlattenCurves(unittest.TestCase):
+    '''
+    Contains the unit tests for the function flatten_curves
+    '''
+    def setUp(self):
+        self.curves = pd.DataFrame({
+            'ID': [1, 2],
+            'X': [[0, 5, 10079], [0, 10079]],
+            'Y': [[1.0, 2.0, 3.0], [4.0, 5.0]]
+        })
+
+    def test_expected_output(self):
+        '''test if each timepoint of a curve is flattened into its own row.'''
+        flat_curves, lengths = flatten_curves(self.curves)
+        expected = pd.DataFrame({
+            'ID': [1, 1, 1, 2, 2],
+            'X': np.array([0, 5, 10079, 0, 10079], dtype=np.int32),
+            'Y': np.array([1.0, 2.0, 3.0, 4.0, 5.0], dtype=np.float32)
+        })
+        assert_frame_equal(flat_curves, expected)
+        self.assertEqual(lengths.tolist(), [3, 2])
+
+    def test_empty_input(self):
+        '''test if an input without curves gives an empty output with the same columns.'''
+        flat_curves, lengths = flatten_curves(self.curves.iloc[:0])
+        self.assertEqual(flat_curves.columns.tolist(), ['ID', 'X', 'Y'])
+        self.assertEqual(flat_curves.shape[0], 0)
+        self.assertEqual(lengths.shape[0], 0)
+
+    def test_length_mismatch(self):
+        '''test if the correct error is raised for a curve with a different length of X and Y.'''
+        curves = self.curves.copy()
+        curves.at[1, 'Y'] = [4.0]
+        with self.assertRaises(ValueError):
+            flatten_curves(curves)
+
+class TestCurveBounds(unittest.TestCase):
+    '''
+    Contains the unit tests for the function curve_bounds
+    '''
+    def test_expected_output(self):
+        '''test if the minimum and maximum X of each curve are returned, also for unsorted X.'''
+        x_min, x_max = curve_bounds(np.array([5, 0, 10079, 7, 3]), np.array([3, 2]))
+        self.assertEqual(x_min.tolist(), [0, 3])
+        self.assertEqual(x_max.tolist(), [10079, 7])
+
+    def test_no_curves(self):
+        '''test if an input without curves gives empty bounds.'''
+        x_min, x_max = curve_bounds(np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int64))
+        self.assertEqual(x_min.shape[0], 0)
+        self.assertEqual(x_max.shape[0], 0)
+
+    def test_empty_curve(self):
+        '''test if the correct error is raised for a curve without timepoints.'''
+        with self.assertRaises(ValueError):
+            curve_bounds(np.array([0, 10079]), np.array([2, 0]))
+
+class TestStepCurves(unittest.TestCase):
+    '''
+    Contains the unit tests for the function step_curves
+    '''
+    def test_expected_output(self):
+        '''test if each grid timepoint gets the value of the last known timepoint of its curve.'''
+        grid_y = step_curves(
+            np.array([3, 2]),
+            np.array([0, 10, 20, 0, 5]),
+            np.array([1.0, 2.0, 3.0, 4.0, 5.0]),
+            np.array([0, 0, 0, 0, 1, 1, 1]),
+            np.array([0, 9, 10, 10079, 0, 4, 5])
+        )
+        self.assertEqual(grid_y.tolist(), [1.0, 1.0, 2.0, 3.0, 4.0, 4.0, 5.0])
+
+    def test_unsorted_x(self):
+        '''test if unsorted X within a curve gives the same output as sorted X.'''
+        grid_y = step_curves(
+            np.array([3]),
+            np.array([20, 0, 10]),
+            np.array([3.0, 1.0, 2.0]),
+            np.array([0, 0, 0]),
+            np.array([5, 15, 25])
+        )
+        self.assertEqual(grid_y.tolist(), [1.0, 2.0, 3.0])
+
+class TestInterpCurves(unittest.TestCase):
+    '''
+    Contains the unit tests for the function interp_curves
+    '''
+    def test_expected_output(self):
+        '''test if the grid timepoints are linearly interpolated within their own curve.'''
+        grid_y = interp_curves(
+            np.array([2, 3]),
+            np.array([0, 10079, 0, 10, 10079]),
+            np.array([0.0, 10079.0, 1.0, 2.0, 2.0]),
+            np.array([0, 0, 1, 1, 1]),
+            np.array([0, 100, 0, 5, 5000])
+        )
+        np.testing.assert_allclose(grid_y, [0.0, 100.0, 1.0, 1.5, 2.0])
+
+    def test_unsorted_x(self):
+        '''test if unsorted X within a curve gives the same output as sorted X.'''
+        grid_y = interp_curves(
+            np.array([3]),
+            np.array([10079, 0, 10]),
+            np.array([2.0, 1.0, 2.0]),
+            np.array([0, 0]),
+            np.array([5, 20])
+        )
+        np.testing.assert_allclose(grid_y, [1.5, 2.0])
+
+class TestCompositeKey(unittest.TestCase):
+    '''
+    Contains the unit tests for the function composite_key
+    '''
+    def setUp(self):
+        self.data = pd.DataFrame({
+            'A': ['b', 'a', 'b', 'a'],
+            'B': ['y', 'y', 'x', 'y']
+        })
+
+    def test_factorized_columns(self):
+        '''test if equal rows get equal keys and the keys are ordered like the columns.'''
+        key = composite_key(self.data, ['A', 'B'])
+        self.assertEqual(key[1], key[3])
+        self.assertEqual(np.argsort(key, kind='stable').tolist(), [1, 3, 2, 0])
+
+    def test_categorical_columns(self):
+        '''test if categorical columns give the same keys as the factorized columns.'''
+        categorical = self.data.astype('category')
+        self.assertEqual(
+            composite_key(categorical, ['A', 'B']).tolist(),
+            composite_key(self.data, ['A', 'B']).tolist()
+        )
+
+    def test_missing_values(self):
+        '''test if rows with a missing value get the key -1 instead of the key of another row.'''
+        data = pd.DataFrame({'A': ['a', 'b', 'b'], 'B': ['x', 'y', None]})
+        self.assertEqual(composite_key(data, ['A', 'B']).tolist(), [0, 3, -1])
+        self.assertEqual(composite_key(data.astype('category'), ['A', 'B']).tolist(), [0, 3, -1])
+
+class TestSharedCompositeKey(unittest.TestCase):
+    '''
+    Contains the unit tests for the function shared_composite_key
+    '''
+    def setUp(self):
+        self.left = pd.DataFrame({'A': ['b', 'a'], 'B': ['x', 'y']})
+        self.right = pd.DataFrame({'A': ['a', 'c', 'b'], 'B': ['y', 'x', 'x']})
+
+    def test_factorized_columns(self):
+        '''test if equal rows in both DataFrames get equal keys.'''
+        left_key, right_key = shared_composite_key(self.left, self.right, ['A', 'B'])
+        self.assertEqual(left_key.tolist(), [right_key[2], right_key[0]])
+        self.assertEqual(len(set(right_key.tolist())), 3)
+
+    def test_categorical_columns(self):
+        '''test if categorical columns with the same dtype give comparable keys.'''
+        dtypes = {
+            column: pd.CategoricalDtype(sorted(set(self.left[column]) | set(self.right[column])))
+            for column in ['A', 'B']
+        }
+        left_key, right_key = shared_composite_key(
+            self.left.astype(dtypes), self.right.astype(dtypes), ['A', 'B']
+        )
+        self.assertEqual(left_key.tolist(), [right_key[2], right_key[0]])
+
+    def test_categorical_columns_reordered_categories(self):
+        '''test if categorical columns with differently ordered categories give comparable keys.'''
+        left = self.left.astype({'A': pd.CategoricalDtype(['a', 'b', 'c'])})
+        right = self.right.astype({'A': pd.CategoricalDtype(['c', 'b', 'a'])})
+        left_key, right_key = shared_composite_key(left, right, ['A', 'B'])
+        self.assertEqual(left_key.tolist(), [right_key[2], right_key[0]])
+
+    def test_missing_values(self):
+        '''test if rows with a missing value get the key -1 in both DataFrames.'''
+        self.left.loc[1, 'B'] = None
+        self.right.loc[2, 'A'] = None
+        left_key, right_key = shared_composite_key(self.left, self.right, ['A', 'B'])
+        self.assertEqual(left_key[1], -1)
+        self.assertEqual(right_key[2], -1)
+        self.assertNotIn(-1, left_key[:1].tolist() + right_key[:2].tolist())
+
+    def test_categorical_columns_different_categories(self):
+        '''test if categorical columns with different categories fall back to factorizing.'''
+        left_key, right_key = shared_composite_key(
+            self.left.astype('category'), self.right.astype('category'), ['A', 'B']
+        )
+        self.assertEqual(left_key.tolist(), [right_key[2], right_key[0]])
+
+class TestTransformQosData(unittest.TestCase):
+    '''
+    Contains the unit tests for the function transform_qos_data
+    '''
+    def setUp(self):
+        self.qos_data = pd.DataFrame({
+            'DATE': ['12.06.2023', '19.06.2023', '12.06.2023'],
+            'LOCATION': ['Medicine West', 'Medicine West', 'Advanced Building'],
+            'PRODUCT': ['Spicy Kale Soup', 'Spicy Kale Soup', 'Crispy Mango Burger'],
+            'INVENTORY_CURVE_ID': [1, 2, 3],
+            'CONSUMPTION_PROFILE_CURVE_ID': [10, 11, 12]
+        })
+        self.qos_curves = pd.DataFrame({
+            'CURVE_ID': [1, 2, 3, 10, 11, 12],
+            'CURVE_TYPE': ['inventory'] * 3 + ['consumption_profile'] * 3,
+            'WEEK_START': ['12.06.2023', '19.06.2023', '12.06.2023'] * 2,
+            'X': [np.array([0, 10079])] * 6,
+            'Y': [np.array([1.0, 1.0])] * 6
+        })
+
+    def test_shared_categories(self):
+        '''test if the key columns of both outputs share the same categorical dtype.'''
+        inventory_curves, consumption_curves = transform_qos_data(self.qos_data, self.qos_curves)
+        for column in ['LOCATION', 'CONSUMPTION_PROFILE_CURVE_ID', 'WEEK_START']:
+            self.assertIsInstance(inventory_curves[column].dtype, pd.CategoricalDtype)
+            self.assertEqual(inventory_curves[column].dtype, consumption_curves[column].dtype)
+
+    def test_missing_keys(self):
+        '''test if missing key values are kept as missing values instead of raising an error.'''
+        self.qos_data.loc[2, 'LOCATION'] = None
+        self.qos_curves.loc[4, 'WEEK_START'] = None
+        inventory_curves, consumption_curves = transform_qos_data(self.qos_data, self.qos_curves)
+        self.assertEqual(inventory_curves['LOCATION'].cat.categories.tolist(), ['Medicine West'])
+        self.assertEqual(
+            consumption_curves['WEEK_START'].cat.categories.tolist(), ['12.06.2023', '19.06.2023']
+        )
+        self.assertEqual(inventory_curves['LOCATION'].isna().sum(), 1)
+        self.assertEqual(consumption_curves['LOCATION'].isna().sum(), 1)
+        self.assertEqual(consumption_curves['WEEK_START'].isna().sum(), 1)
 
 class TestCreateFullTimeGrid(unittest.TestCase):
     '''
     Contains the unit tests for the function create_full_time_grid
     '''
-    def setUp(self):
-        # Load test data from test_data folder.
-        self.test_folder = Path(__file__).parent / 'test_data'
-        self.consumption_curves = pd.read_csv(self.test_folder / 'test_consumption_curves.csv')
-        # Convert the X and Y columns to lists.
-        self.consumption_curves['X'] = [
-            literal_eval(item) for item in self.consumption_curves['X']
-        ]
-        self.consumption_curves['Y'] = [
-            literal_eval(item) for item in self.consumption_curves['Y']
-        ]
+    @classmethod
+    def setUpClass(cls):
+        # Load test data from test_data folder once for all tests of the class.
+        cls.consumption_curves = load_fixture('test_consumption_curves.parquet')
 
     def test_output_datatype(self):
         '''test if the output is of datatype DataFrame.'''
@@ -62,18 +294,11 @@ class TestInterpolateConsumptionCurves(unittest.TestCase):
     '''
     Contains the unit tests for the function interpolate_consumption_curves.
     '''
-    def setUp(self):
-        # Load test data from test_data folder.
-        self.test_folder = Path(__file__).parent / 'test_data'
-        self.consumption_curves = pd.read_csv(self.test_folder / 'test_consumption_curves.csv')
-        # Convert the X and Y columns to lists.
-        self.consumption_curves['X'] = [
-            literal_eval(item) for item in self.consumption_curves['X']
-        ]
-        self.consumption_curves['Y'] = [
-            literal_eval(item) for item in self.consumption_curves['Y']
-        ]
-        self.time_point_grid = pd.read_csv(self.test_folder / 'test_time_point_grid.csv')
+    @classmethod
+    def setUpClass(cls):
+        # Load test data from test_data folder once for all tests of the class.
+        cls.consumption_curves = load_fixture('test_consumption_curves.parquet')
+        cls.time_point_grid = load_fixture('test_time_point_grid.parquet')
 
     def test_output_datatype(self):
         '''test if the output is of datatype DataFrame.'''
@@ -111,7 +336,7 @@ class TestInterpolateConsumptionCurves(unittest.TestCase):
         )
         total_consumption = (
             consumption_curves_interp
-            .groupby(['LOCATION', 'WEEK_START'])
+            .groupby(['LOCATION', 'WEEK_START'], observed=True)
             .sum('CONSUMPTION_Y')
         )
         self.assertEqual(
@@ -135,3 +360,65 @@ class TestInterpolateConsumptionCurves(unittest.TestCase):
             consumption_curves_interp[consumption_curves_interp['CONSUMPTION_Y'].isnull()].shape[0],
             0
         )
+
+    def test_unsorted_x(self):
+        '''test if unsorted X within a curve gives the same output as sorted X.'''
+        expected = interpolate_consumption_curves(
+            self.consumption_curves.copy(),
+            self.time_point_grid.copy()
+        )
+        unsorted_curves = self.consumption_curves.copy()
+        unsorted_curves['X'] = [x[::-1] for x in unsorted_curves['X']]
+        unsorted_curves['Y'] = [y[::-1] for y in unsorted_curves['Y']]
+        consumption_curves_interp = interpolate_consumption_curves(
+            unsorted_curves,
+            self.time_point_grid.copy()
+        )
+        assert_frame_equal(consumption_curves_interp, expected)
+
+    def test_non_categorical_keys(self):
+        '''test if key columns that are not categorical give the same output.'''
+        key_columns = ['LOCATION', 'WEEK_START']
+        expected = interpolate_consumption_curves(
+            self.consumption_curves.copy(),
+            self.time_point_grid.copy()
+        )
+        consumption_curves_interp = interpolate_consumption_curves(
+            as_object_keys(self.consumption_curves, key_columns),
+            as_object_keys(self.time_point_grid, key_columns)
+        )
+        assert_frame_equal(consumption_curves_interp, as_object_keys(expected, key_columns))
+
+    def test_empty_curve(self):
+        '''test if the correct error is raised for a curve without timepoints.'''
+        consumption_curves = self.consumption_curves.copy()
+        for column in ['X', 'Y']:
+            values = consumption_curves[column].tolist()
+            values[0] = values[0][:0]
+            consumption_curves[column] = values
+        with self.assertRaises(ValueError):
+            interpolate_consumption_curves(consumption_curves, self.time_point_grid.copy())
+
+    def test_missing_keys(self):
+        '''test if rows with a missing key still get the values of the curve with the same keys.'''
+        expected = interpolate_consumption_curves(
+            self.consumption_curves.copy(),
+            self.time_point_grid.copy()
+        )
+        location = self.consumption_curves['LOCATION'].iloc[0]
+        consumption_curves = self.consumption_curves.copy()
+        time_point_grid = self.time_point_grid.copy()
+        consumption_curves.loc[consumption_curves['LOCATION'] == location, 'WEEK_START'] = None
+        time_point_grid.loc[time_point_grid['LOCATION'] == location, 'WEEK_START'] = None
+        consumption_curves_interp = interpolate_consumption_curves(
+            consumption_curves,
+            time_point_grid
+        )
+        missing = consumption_curves_interp['WEEK_START'].isna()
+        # The rows with a missing key are sorted last.
+        self.assertFalse(missing.iloc[:(~missing).sum()].any())
+        assert_frame_equal(
+            consumption_curves_interp[~missing],
+            expected[expected['LOCATION'] != location]
+        )
+        self.assertEqual(consumption_curves_interp['CONSUMPTION_Y'].isna().sum(), 0)
@@ -0,0 +1,7 @@
+'''
+WSGI entrypoint to serve the Quality of Service api with a production WSGI server, e.g.:
+    gunicorn -w $(nproc) -k gthread --threads 4 --chdir solution wsgi:app
+'''
+from qos_api import create_app
+
+app = create_app()